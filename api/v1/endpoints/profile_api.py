@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+from core.utils import responses, FastJSONResponse
+from core.security import require_admin
+from core.profiler import profiler
+
+# Admin endpoints serving request profiles; only included when PROFILING_ENABLED is set
+profileRouter = APIRouter(prefix="/debug/profiles", tags=["DEBUG"], dependencies=[Depends(require_admin)])
+
+@profileRouter.get("")
+async def list_profiles():
+    """
+    List the profiles in the ring buffer, newest first (admin only).
+
+    Returns:
+    - A response object with the ID, request, duration, status and sample count of each profile.
+    """
+    profiles = [profile.summary() for profile in reversed(profiler.profiles)]
+    return await responses(message="Profiles retrieved.", status_code=200, data={ "profiles": profiles })
+
+@profileRouter.get("/{profile_id}")
+async def download_profile(profile_id: int, format: str = Query("speedscope", pattern="^(speedscope|folded)$")):
+    """
+    Download a request profile (admin only).
+
+    - **profile_id**: The ID returned in the `X-Profile-Id` header of the profiled response.
+    - **format**: `speedscope` for a file to open at https://www.speedscope.app, or `folded` for
+      flamegraph.pl-style folded stacks.
+
+    Returns:
+    - The profile as an attachment, or a 404 response if it is unknown or was dropped from the ring buffer.
+    """
+    profile = profiler.get(profile_id)
+    if profile is None:
+        return await responses(status_code=404, error={ "error": "Profile not found." })
+    if format == "folded":
+        return PlainTextResponse(
+            profile.folded(), headers={ "Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"' }
+        )
+    return FastJSONResponse(
+        profile.speedscope(), headers={ "Content-Disposition": f'attachment; filename="profile-{profile_id}.speedscope.json"' }
+    )
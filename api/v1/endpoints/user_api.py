@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends
-from core.database import get_db
+from fastapi import APIRouter, Depends, Request, Query, Header
+from core.database import get_db, get_read_db
+from core.utils import responses
 from crud.user_crud import CRUD
+from crud.import_crud import UserImport
 from sqlalchemy.orm import Session
 from schemas.user_schema import UserProfile, Login, AccessToken, UserBasicInfo
-from core.security import get_current_user
+from schemas.token_schema import TokenData
+from core.security import get_current_token, require_admin, auth_scheme
+from core.throttle import login_admission
 
 # Initialize a new APIRouter instance for user-related endpoints
 userRouter = APIRouter()
@@ -24,12 +28,13 @@ async def create_user(userInfo: UserProfile, db: Session = Depends(get_db)):
     response = await user_crud.create_new_user(db=db, user=userInfo)
     return response
 
-@userRouter.post("/auth/login")
-async def authenticate_user(loginInfo: Login, db: Session = Depends(get_db)):
+@userRouter.post("/auth/login", dependencies=[Depends(login_admission)])
+async def authenticate_user(loginInfo: Login, db: Session = Depends(get_db), read_db: Session = Depends(get_read_db)):
     """
     Authenticate a user and obtain an access token.
 
     This endpoint is used for user login. It verifies user credentials and returns an access token if valid.
+    Attempts are throttled per email and per client IP before any credentials are checked.
 
     - **loginInfo**: The login credentials of the user.
 
@@ -37,7 +42,7 @@ async def authenticate_user(loginInfo: Login, db: Session = Depends(get_db)):
     - A response object containing the access token.
     """
     user_login = CRUD()
-    response = await user_login.authenticate_user(loginInfo=loginInfo, db=db)
+    response = await user_login.authenticate_user(loginInfo=loginInfo, db=db, read_db=read_db)
     return response
 
 @userRouter.post("/auth/refresh-token")
@@ -56,14 +61,113 @@ async def get_refresh_token(token: AccessToken, db: Session = Depends(get_db)):
     response = await refreshToken.refresh_expired_token(token=token, db=db)
     return response
 
-@userRouter.get("/me", dependencies=[Depends(get_current_user)], response_model=UserBasicInfo)
-async def get_profile(user = Depends(get_current_user), db: Session = Depends(get_db)):
+@userRouter.post("/auth/logout")
+async def logout(token: str = Depends(auth_scheme), token_data: TokenData = Depends(get_current_token), db: Session = Depends(get_db)):
+    """
+    Log out the currently authenticated user.
+
+    This endpoint revokes the bearer access token and deletes the user's refresh token, so neither can be
+    used again; logging in issues new ones.
+
+    Returns:
+    - A response object indicating the result of the operation.
+    """
+    user_logout = CRUD()
+    response = await user_logout.logout(token=token, token_data=token_data, db=db)
+    return response
+
+@userRouter.post("/auth/revoke")
+async def revoke_token(token: AccessToken, db: Session = Depends(get_db)):
+    """
+    Revoke an access token.
+
+    This endpoint revokes the access token given in the request body before it expires.
+
+    - **token**: The access token to revoke.
+
+    Returns:
+    - A response object indicating the result of the operation.
+    """
+    token_revoke = CRUD()
+    response = await token_revoke.revoke_token(token=token, db=db)
+    return response
+
+@userRouter.get("/me", response_model=UserBasicInfo, responses={304: {"description": "Profile not modified"}})
+async def get_profile(
+    token_data: TokenData = Depends(get_current_token), db: Session = Depends(get_read_db),
+    if_none_match: str = Header(None)
+):
     """
     Retrieve the profile of the currently authenticated user.
 
-    This endpoint returns the profile information of the currently logged-in user.
+    This endpoint returns the profile information of the currently logged-in user, with an ETag.
+    Sending that ETag back in `If-None-Match` returns 304 Not Modified while the profile is unchanged.
 
     Returns:
     - The profile information of the currently authenticated user.
     """
-    return user
+    user_profile = CRUD()
+    response = await user_profile.get_profile(user_id=token_data.id, db=db, if_none_match=if_none_match)
+    return response
+
+@userRouter.post("/users/import", dependencies=[Depends(require_admin)])
+async def import_users(request: Request, format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """
+    Bulk import users from a streamed NDJSON or CSV request body (admin only).
+
+    Rows are validated like `/register-user`, hashed in parallel and loaded with COPY in batches;
+    the body is never held in memory as a whole.
+
+    - **format**: Either `ndjson` (one JSON object per line) or `csv` (with a header row).
+
+    Returns:
+    - A response object with the import counts and the per-row errors.
+    """
+    importer = UserImport(fmt=format)
+    report = await importer.run(request.stream())
+    return await responses(message="Import finished.", status_code=200, data=report)
+
+@userRouter.get("/users", dependencies=[Depends(require_admin)])
+async def list_users(
+    after_id: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), stream: bool = False,
+    db: Session = Depends(get_read_db)
+):
+    """
+    List users ordered by user ID, using keyset pagination (admin only).
+
+    - **after_id**: Return users after this user ID; pass the previous page's `next_after_id`.
+    - **limit**: Page size, at most 1000.
+    - **stream**: Stream every remaining user as NDJSON instead of returning one page.
+
+    Returns:
+    - A page of users with the `next_after_id` cursor, or an NDJSON stream of users.
+    """
+    user_crud = CRUD()
+    if stream:
+        return user_crud.stream_users(after_id=after_id)
+    return await user_crud.list_users(db=db, after_id=after_id, limit=limit)
+
+@userRouter.get("/users/search", dependencies=[Depends(require_admin)])
+async def search_users(
+    name: str = Query(None, min_length=3, max_length=100), location: str = Query(None, min_length=3, max_length=100),
+    prefix: bool = False, after_id: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Search users by name and/or location, ordered by user ID, using keyset pagination (admin only).
+
+    Matching is case-insensitive and served by trigram indexes; when both terms are given, users must match both.
+
+    - **name**: Text the name contains, at least 3 characters.
+    - **location**: Text the location contains, at least 3 characters.
+    - **prefix**: Match names and locations starting with the terms instead of containing them.
+    - **after_id**: Return users after this user ID; pass the previous page's `next_after_id`.
+    - **limit**: Page size, at most 100.
+
+    Returns:
+    - A page of matching users with the `next_after_id` cursor.
+    """
+    user_crud = CRUD()
+    return await user_crud.search_users(
+        db=db, name=name, location=location, prefix=prefix, after_id=after_id, limit=limit
+    )
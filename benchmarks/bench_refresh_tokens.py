@@ -0,0 +1,84 @@
+"""
+Benchmark refresh token storage: the previous unique `Text` column holding the full JWT against the
+unique `bytea` column holding its SHA-256 digest.
+
+Two scratch tables are filled server-side with `--rows` tokens of realistic length (use
+`--rows 10000000` to reproduce the 10M-row measurement). The script reports each unique index's size
+and the latency of random point lookups, then drops the tables.
+
+Usage:
+    python -m benchmarks.bench_refresh_tokens --rows 1000000 --lookups 5000
+"""
+import time
+import base64
+import random
+import hashlib
+import argparse
+from sqlalchemy import text
+from core.database import engine
+
+# A realistic refresh token prefix: header and claims of an HS256 JWT; the row number keeps tokens unique
+TOKEN_PREFIX = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJpZCI6"
+
+SETUP = [
+    "DROP TABLE IF EXISTS bench_text_tokens, bench_digest_tokens",
+    "CREATE TABLE bench_text_tokens (tokenid serial PRIMARY KEY, tokens text UNIQUE)",
+    "CREATE TABLE bench_digest_tokens (tokenid serial PRIMARY KEY, token_digest bytea UNIQUE NOT NULL)",
+]
+FILL_TEXT = """
+    INSERT INTO bench_text_tokens (tokens)
+    SELECT :prefix || i || '.' || encode(sha256(int8send(i)), 'base64') FROM generate_series(1, :rows) AS i
+"""
+FILL_DIGEST = "INSERT INTO bench_digest_tokens (token_digest) SELECT sha256(convert_to(tokens, 'UTF8')) FROM bench_text_tokens"
+INDEX_SIZE = "SELECT pg_relation_size(indexrelid) FROM pg_index WHERE indrelid = CAST(:table AS regclass) AND NOT indisprimary"
+
+
+def token_for(row: int):
+    # Mirrors FILL_TEXT: sha256 of the row number as a big-endian int8
+    digest = hashlib.sha256(row.to_bytes(8, "big", signed = True)).digest()
+    return f"{TOKEN_PREFIX}{row}.{base64.b64encode(digest).decode()}"
+
+
+def time_lookups(connection, statement, values):
+    timings = []
+    for value in values:
+        start = time.perf_counter()
+        assert connection.execute(statement, { "value": value }).scalar() is not None
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return sum(timings) / len(timings) * 1000, timings[int(len(timings) * 0.99)] * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmark refresh token storage.")
+    parser.add_argument("--rows", type = int, default = 1000000, help = "Tokens stored in each table")
+    parser.add_argument("--lookups", type = int, default = 5000, help = "Random point lookups timed per table")
+    args = parser.parse_args()
+
+    with engine.connect() as connection:
+        for statement in SETUP:
+            connection.execute(text(statement))
+        start = time.perf_counter()
+        connection.execute(text(FILL_TEXT), { "prefix": TOKEN_PREFIX, "rows": args.rows })
+        connection.execute(text(FILL_DIGEST))
+        connection.execute(text("ANALYZE bench_text_tokens"))
+        connection.execute(text("ANALYZE bench_digest_tokens"))
+        connection.commit()
+        print(f"Filled {args.rows:,} rows per table in {time.perf_counter() - start:.1f} s")
+
+        try:
+            tokens = [token_for(random.randint(1, args.rows)) for _ in range(args.lookups)]
+            digests = [hashlib.sha256(token.encode()).digest() for token in tokens]
+            for name, table, statement, values in (
+                ("text token", "bench_text_tokens",
+                 text("SELECT tokenid FROM bench_text_tokens WHERE tokens = :value"), tokens),
+                ("sha-256 digest", "bench_digest_tokens",
+                 text("SELECT tokenid FROM bench_digest_tokens WHERE token_digest = :value"), digests),
+            ):
+                size = connection.execute(text(INDEX_SIZE), { "table": table }).scalar()
+                avg_ms, p99_ms = time_lookups(connection, statement, values)
+                print(f"{name:>16}: index {size / 2 ** 20:>9.1f} MiB  lookup avg {avg_ms:.3f} ms  p99 {p99_ms:.3f} ms")
+        finally:
+            connection.rollback()
+            connection.execute(text("DROP TABLE bench_text_tokens, bench_digest_tokens"))
+            connection.commit()
@@ -0,0 +1,123 @@
+"""
+Benchmark user registration: the previous SELECT + INSERT + COMMIT + REFRESH path against the single
+INSERT ... ON CONFLICT (email) DO NOTHING RETURNING statement used by CRUD.create_new_user.
+
+Both paths run through the asyncpg engine with a pre-computed password hash, so the numbers measure
+database round-trips rather than bcrypt. A share of the signups reuse an email that another concurrent
+request is registering at the same time, which exposes the race window in the old path.
+
+Usage:
+    python -m benchmarks.bench_registration --signups 5000 --concurrency 50
+"""
+import time
+import uuid
+import asyncio
+import argparse
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from core.database import async_database_url
+from core.hashing import password_context
+from models.user_model import UserProfile
+
+
+async def select_then_insert(db, email: str, hashed_password: str):
+    """
+    The previous registration path: check, insert, commit and refresh.
+    """
+    result = await db.execute(select(UserProfile).where(UserProfile.email == email))
+    if result.scalar_one_or_none():
+        return "duplicate"
+    db_object = UserProfile(name = "Bench", email = email, location = "Bench", password = hashed_password)
+    db.add(db_object)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Lost the race between the SELECT and the INSERT; the API surfaced this as a 500
+        await db.rollback()
+        return "error"
+    await db.refresh(db_object)
+    return "created"
+
+
+async def insert_on_conflict(db, email: str, hashed_password: str):
+    """
+    The current registration path: one atomic upsert that reports duplicates as no row.
+    """
+    statement = insert(UserProfile).values(
+        name = "Bench", email = email, location = "Bench", password = hashed_password
+    ).on_conflict_do_nothing(index_elements = [UserProfile.email]).returning(UserProfile.user_id)
+    result = await db.execute(statement)
+    if result.scalar_one_or_none() is None:
+        await db.rollback()
+        return "duplicate"
+    await db.commit()
+    return "created"
+
+
+def percentile(samples, pct: float):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+async def run(path, session_factory, emails, hashed_password: str, concurrency: int):
+    """
+    Register every email with the given path, keeping `concurrency` signups in flight.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+    outcomes = {"created": 0, "duplicate": 0, "error": 0}
+
+    async def signup(email):
+        async with slots:
+            start = time.perf_counter()
+            async with session_factory() as db:
+                outcome = await path(db, email, hashed_password)
+            latencies.append(time.perf_counter() - start)
+            outcomes[outcome] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(signup(email) for email in emails))
+    elapsed = time.perf_counter() - start
+    return {
+        "signups_per_sec": len(emails) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        **outcomes,
+    }
+
+
+async def main(signups: int, concurrency: int, duplicate_ratio: float):
+    engine = create_async_engine(async_database_url, pool_size = concurrency, max_overflow = 0)
+    session_factory = async_sessionmaker(engine, expire_on_commit = False)
+    hashed_password = password_context.hash("benchmark-password")
+
+    try:
+        for name, path in (("select_then_insert", select_then_insert), ("insert_on_conflict", insert_on_conflict)):
+            prefix = f"bench-{uuid.uuid4().hex[:8]}"
+            duplicates = int(signups * duplicate_ratio)
+            emails = []
+            for i in range(signups - duplicates):
+                emails.append(f"{prefix}-{i}@example.com")
+                # Duplicates directly follow their original so the two signups race each other
+                if i < duplicates:
+                    emails.append(f"{prefix}-{i}@example.com")
+            result = await run(path, session_factory, emails, hashed_password, concurrency)
+            print(f"{name:>20}: " + ", ".join(
+                f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}" for key, value in result.items()
+            ))
+            async with session_factory() as db:
+                await db.execute(delete(UserProfile).where(UserProfile.email.like(f"{prefix}-%")))
+                await db.commit()
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmark user registration strategies.")
+    parser.add_argument("--signups", type = int, default = 5000, help = "Number of signups per strategy")
+    parser.add_argument("--concurrency", type = int, default = 50, help = "Signups kept in flight at once")
+    parser.add_argument("--duplicate-ratio", type = float, default = 0.1, help = "Share of signups reusing an email")
+    args = parser.parse_args()
+    asyncio.run(main(args.signups, args.concurrency, args.duplicate_ratio))
@@ -0,0 +1,127 @@
+"""
+Benchmark the user search: ILIKE prefix and substring queries on `name` and `location`, first as
+sequential scans and then served by `pg_trgm` GIN indexes.
+
+A scratch table shaped like `users` is filled server-side with `--rows` users whose names combine
+common first and last names with a random tag, so searches range from thousands of matches to one.
+Each query runs like `/api/v1/users/search` (ordered by user ID, one page of `--limit` rows). The
+script reports latency without indexes, builds the trigram indexes and reports it again, then drops
+the table. The second pass is skipped when the server does not ship the pg_trgm extension.
+
+Usage:
+    python -m benchmarks.bench_search --rows 5000000 --queries 200
+"""
+import time
+import random
+import hashlib
+import argparse
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from core.database import engine
+from core.utils import like_pattern
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+               "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Amina", "Kwame"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Okafor", "Mensah"]
+CITIES = ["Lagos", "Accra", "Nairobi", "London", "Berlin", "Paris", "New York", "San Francisco", "Toronto", "Sydney",
+          "Kathmandu", "Pokhara", "Mumbai", "Singapore", "Tokyo", "Madrid", "Lisbon", "Cape Town", "Cairo", "Dubai"]
+
+SETUP = [
+    "DROP TABLE IF EXISTS bench_users",
+    "CREATE TABLE bench_users (user_id serial PRIMARY KEY, name varchar NOT NULL, location varchar NOT NULL)",
+]
+# The tag is the first 6 hex digits of md5(row number), giving near-unique search terms
+FILL = """
+    INSERT INTO bench_users (name, location)
+    SELECT (CAST(:first AS text[]))[1 + i % 20] || ' ' || (CAST(:last AS text[]))[1 + (i / 20) % 20]
+               || ' ' || substr(md5(CAST(i AS text)), 1, 6),
+           (CAST(:cities AS text[]))[1 + (i / 400) % 20]
+    FROM generate_series(1, :rows) AS i
+"""
+INDEXES = [
+    "CREATE INDEX bench_users_name_trgm ON bench_users USING gin (name gin_trgm_ops)",
+    "CREATE INDEX bench_users_location_trgm ON bench_users USING gin (location gin_trgm_ops)",
+]
+INDEX_SIZE = "SELECT COALESCE(SUM(pg_relation_size(indexrelid)), 0) FROM pg_index WHERE indrelid = CAST('bench_users' AS regclass) AND NOT indisprimary"
+SEARCH = {
+    "name": text("SELECT user_id, name, location FROM bench_users WHERE user_id > 0 AND name ILIKE :pattern ESCAPE '\\' ORDER BY user_id LIMIT :limit"),
+    "location": text("SELECT user_id, name, location FROM bench_users WHERE user_id > 0 AND location ILIKE :pattern ESCAPE '\\' ORDER BY user_id LIMIT :limit"),
+}
+
+
+def tag_for(row: int):
+    # Mirrors FILL: the first 6 hex digits of md5 of the row number
+    return hashlib.md5(str(row).encode()).hexdigest()[:6]
+
+
+def workloads(rows: int, queries: int):
+    # (label, column, terms, prefix): from many matching rows down to a single one
+    return [
+        ("name prefix, common", "name", [random.choice(FIRST_NAMES)[:4] for _ in range(queries)], True),
+        ("name substring, common", "name", [random.choice(LAST_NAMES)[1:5] for _ in range(queries)], False),
+        ("name substring, rare", "name", [tag_for(random.randint(1, rows))[:5] for _ in range(queries)], False),
+        ("name substring, none", "name", [f"zq{random.randint(100, 999)}x" for _ in range(queries)], False),
+        ("location substring", "location", [random.choice(CITIES)[1:5] for _ in range(queries)], False),
+    ]
+
+
+def time_searches(connection, column: str, terms, prefix: bool, limit: int):
+    timings = []
+    for term in terms:
+        start = time.perf_counter()
+        connection.execute(SEARCH[column], { "pattern": like_pattern(term, prefix), "limit": limit }).all()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return sum(timings) / len(timings) * 1000, timings[int(len(timings) * 0.99)] * 1000
+
+
+def report(connection, title: str, loads, limit: int):
+    print(title)
+    for label, column, terms, prefix in loads:
+        avg_ms, p99_ms = time_searches(connection, column, terms, prefix, limit)
+        print(f"{label:>24}: avg {avg_ms:9.3f} ms  p99 {p99_ms:9.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmark the indexed user search.")
+    parser.add_argument("--rows", type = int, default = 1000000, help = "Users in the scratch table")
+    parser.add_argument("--queries", type = int, default = 200, help = "Searches timed per workload")
+    parser.add_argument("--limit", type = int, default = 20, help = "Page size of each search")
+    args = parser.parse_args()
+
+    with engine.connect() as connection:
+        for statement in SETUP:
+            connection.execute(text(statement))
+        start = time.perf_counter()
+        connection.execute(text(FILL), { "first": FIRST_NAMES, "last": LAST_NAMES, "cities": CITIES, "rows": args.rows })
+        connection.execute(text("ANALYZE bench_users"))
+        connection.commit()
+        print(f"Filled {args.rows:,} users in {time.perf_counter() - start:.1f} s")
+
+        try:
+            loads = workloads(args.rows, args.queries)
+            # Sequential scans could otherwise take minutes per workload on large tables
+            report(connection, "Without trigram indexes:", [
+                (label, column, terms[:max(args.queries // 10, 5)], prefix) for label, column, terms, prefix in loads
+            ], args.limit)
+
+            try:
+                connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                connection.commit()
+            except DBAPIError as e:
+                connection.rollback()
+                print(f"pg_trgm is not available on this server, skipping the indexed run: {str(e.orig).splitlines()[0]}")
+            else:
+                start = time.perf_counter()
+                for statement in INDEXES:
+                    connection.execute(text(statement))
+                connection.execute(text("ANALYZE bench_users"))
+                connection.commit()
+                size = connection.execute(text(INDEX_SIZE)).scalar()
+                print(f"Built trigram indexes ({size / 2 ** 20:.1f} MiB) in {time.perf_counter() - start:.1f} s")
+                report(connection, "With trigram indexes:", loads, args.limit)
+        finally:
+            connection.rollback()
+            connection.execute(text("DROP TABLE bench_users"))
+            connection.commit()
@@ -0,0 +1,58 @@
+"""
+Microbenchmark response serialization: the previous stdlib-json JSONResponse built from `User.dict()`
+against the orjson-backed FastJSONResponse that serializes the Pydantic model directly, plus the
+pre-encoded StaticError bodies used for fixed error responses.
+
+Usage:
+    python -m benchmarks.bench_serialization --iterations 100000
+"""
+import timeit
+import argparse
+from fastapi.responses import JSONResponse
+from core.utils import FastJSONResponse, StaticError
+from schemas import user_schema, token_schema
+
+# A login response payload with realistically sized tokens
+TOKEN = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9." + "x" * 120 + "." + "y" * 43
+USER = user_schema.User(
+    name = "Jane Doe", email = "jane.doe@example.com", location = "Kathmandu", about = "Benchmark user " * 8,
+    user_token = token_schema.RefreshToken(token = TOKEN, refreshToken = TOKEN),
+)
+NOT_FOUND = { "error": "User not found. Try creating an account." }
+STATIC_NOT_FOUND = StaticError(404, NOT_FOUND)
+
+
+def json_login():
+    return JSONResponse(status_code = 200, content = { "message": "Login successful.", "data": USER.dict() }).body
+
+
+def orjson_login():
+    return FastJSONResponse(status_code = 200, content = { "message": "Login successful.", "data": USER }).body
+
+
+def json_error():
+    return JSONResponse(status_code = 404, content = { "error": NOT_FOUND }).body
+
+
+def static_error():
+    return STATIC_NOT_FOUND.response().body
+
+
+def measure(func, iterations: int):
+    size = len(func())
+    seconds = min(timeit.repeat(func, number = iterations, repeat = 3))
+    ops = iterations / seconds
+    return ops, ops * size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmark response serialization.")
+    parser.add_argument("--iterations", type = int, default = 100000, help = "Responses rendered per repeat")
+    args = parser.parse_args()
+
+    for name, func in (
+        ("login: json + .dict()", json_login), ("login: orjson model", orjson_login),
+        ("error: json", json_error), ("error: pre-encoded", static_error),
+    ):
+        ops, throughput = measure(func, args.iterations)
+        print(f"{name:>24}: {ops:>12,.0f} responses/s {throughput / 1e6:>10.1f} MB/s")
@@ -0,0 +1,193 @@
+"""
+Load test the auth endpoints: `/register-user`, `/auth/login`, `/auth/refresh-token` and `/me`.
+
+By default the application is driven in-process through an httpx ASGI transport (startup and shutdown
+hooks included); pass `--base-url` to drive a running uvicorn instead. Each phase reports throughput
+and p50/p95/p99 latency per endpoint, and the results are written as JSON so runs can be compared.
+
+A throwaway Postgres can be started with `docker compose -f benchmarks/docker-compose.yml up -d`,
+using the connection settings listed in that file. All logins come from one client IP, so run the
+application with LOGIN_RATE_LIMIT_ENABLED=false when `--users` exceeds LOGIN_ATTEMPTS_PER_IP.
+
+Usage:
+    python -m benchmarks.load_test --users 200 --requests 5000 --concurrency 50 --output results.json
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 --compare results.json
+"""
+import sys
+import time
+import uuid
+import asyncio
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+import httpx
+import orjson
+
+API_PREFIX = "/api/v1"
+
+
+def percentile(samples, pct: float):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+class EndpointStats:
+    """
+    Latency samples and error count for one endpoint phase.
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def report(self):
+        if not self.latencies:
+            return { "requests": 0, "errors": self.errors }
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "throughput_rps": len(self.latencies) / self.elapsed,
+            "p50_ms": percentile(self.latencies, 50) * 1000,
+            "p95_ms": percentile(self.latencies, 95) * 1000,
+            "p99_ms": percentile(self.latencies, 99) * 1000,
+        }
+
+
+async def run_phase(calls, concurrency: int, expected_status: int):
+    """
+    Run request factories with `concurrency` requests in flight and collect their latencies.
+
+    - **calls**: Iterable of zero-argument coroutine functions, each issuing one request.
+    - **expected_status**: Status code counted as success.
+
+    Returns:
+    - The EndpointStats of the phase and the successful responses, in call order.
+    """
+    stats = EndpointStats()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def timed(call):
+        async with slots:
+            start = time.perf_counter()
+            try:
+                response = await call()
+            except httpx.HTTPError:
+                stats.errors += 1
+                return None
+            stats.latencies.append(time.perf_counter() - start)
+            if response.status_code != expected_status:
+                stats.errors += 1
+                return None
+            return response
+
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(timed(call) for call in calls))
+    stats.elapsed = time.perf_counter() - start
+    return stats, responses
+
+
+async def run(client: httpx.AsyncClient, users: int, requests: int, concurrency: int):
+    prefix = uuid.uuid4().hex[:8]
+    password = "load-test-password"
+    emails = [f"load-{prefix}-{i}@example.com" for i in range(users)]
+    results = {}
+
+    def register(email):
+        return lambda: client.post(f"{API_PREFIX}/register-user", json = {
+            "name": "Load Test", "email": email, "location": "Benchmark", "about": None, "password": password
+        })
+
+    stats, _ = await run_phase([register(email) for email in emails], concurrency, 201)
+    results["register-user"] = stats.report()
+
+    def login(email):
+        return lambda: client.post(f"{API_PREFIX}/auth/login", json = { "email": email, "password": password })
+
+    stats, responses = await run_phase([login(email) for email in emails], concurrency, 200)
+    results["auth/login"] = stats.report()
+    tokens = [response.json()["data"]["user_token"] for response in responses if response is not None]
+    if not tokens:
+        raise SystemExit("No user could log in; check the application logs.")
+
+    def me(token):
+        return lambda: client.get(f"{API_PREFIX}/me", headers = { "Authorization": f"Bearer {token['token']}" })
+
+    stats, _ = await run_phase([me(tokens[i % len(tokens)]) for i in range(requests)], concurrency, 200)
+    results["me"] = stats.report()
+
+    def refresh(token):
+        return lambda: client.post(f"{API_PREFIX}/auth/refresh-token", json = { "token": token["refreshToken"] })
+
+    stats, _ = await run_phase([refresh(tokens[i % len(tokens)]) for i in range(requests)], concurrency, 200)
+    results["auth/refresh-token"] = stats.report()
+    return results
+
+
+async def main(args):
+    if args.base_url:
+        async with httpx.AsyncClient(base_url = args.base_url, timeout = args.timeout) as client:
+            return await run(client, args.users, args.requests, args.concurrency)
+
+    from main import app
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app = app)
+        async with httpx.AsyncClient(transport = transport, base_url = "http://load-test", timeout = args.timeout) as client:
+            return await run(client, args.users, args.requests, args.concurrency)
+    finally:
+        await app.router.shutdown()
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text = True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    print(f"{'endpoint':>20} {'requests':>9} {'errors':>7} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, report in results.items():
+        line = (
+            f"{endpoint:>20} {report['requests']:>9} {report['errors']:>7} {report.get('throughput_rps', 0):>10.1f} "
+            f"{report.get('p50_ms', 0):>9.1f} {report.get('p95_ms', 0):>9.1f} {report.get('p99_ms', 0):>9.1f}"
+        )
+        previous = (baseline or {}).get(endpoint)
+        if previous and previous.get("throughput_rps") and report.get("throughput_rps"):
+            change = (report["throughput_rps"] / previous["throughput_rps"] - 1) * 100
+            line += f"   req/s {change:+.1f}%  p99 {report['p99_ms'] - previous['p99_ms']:+.1f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Load test the auth endpoints.")
+    parser.add_argument("--base-url", help = "Drive a running server instead of the in-process app")
+    parser.add_argument("--users", type = int, default = 100, help = "Users registered and logged in")
+    parser.add_argument("--requests", type = int, default = 2000, help = "Requests per /me and refresh phase")
+    parser.add_argument("--concurrency", type = int, default = 50, help = "Requests kept in flight at once")
+    parser.add_argument("--timeout", type = float, default = 60.0, help = "Per-request timeout in seconds")
+    parser.add_argument("--output", help = "Write the results to this JSON file")
+    parser.add_argument("--compare", help = "Print changes against a previous results file")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare, "rb") as file:
+            baseline = orjson.loads(file.read())["results"]
+    print_results(results, baseline)
+
+    if args.output:
+        document = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "revision": git_revision(),
+            "mode": args.base_url or "in-process",
+            "python": platform.python_version(),
+            "parameters": { "users": args.users, "requests": args.requests, "concurrency": args.concurrency },
+            "results": results,
+        }
+        with open(args.output, "wb") as file:
+            file.write(orjson.dumps(document, option = orjson.OPT_INDENT_2))
+        print(f"Results written to {args.output}", file = sys.stderr)
@@ -0,0 +1,53 @@
+"""
+Bulk import users from an NDJSON or CSV file, using the same pipeline as `POST /api/v1/users/import`.
+
+Usage:
+    python -m cli.import_users users.ndjson
+    python -m cli.import_users users.csv --format csv --batch-size 2000
+"""
+import sys
+import asyncio
+import argparse
+import orjson
+from core.hashing import hashing_executor
+from crud.import_crud import UserImport
+
+# Size of the chunks read from the input file
+CHUNK_SIZE = 1024 * 1024
+
+
+async def read_chunks(path: str):
+    """
+    Read a file (or stdin for "-") in fixed-size binary chunks.
+    """
+    source = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+
+
+async def main(path: str, fmt: str, batch_size: int):
+    try:
+        importer = UserImport(fmt = fmt, batch_size = batch_size)
+        report = await importer.run(read_chunks(path))
+    finally:
+        hashing_executor.shutdown()
+    sys.stdout.buffer.write(orjson.dumps(report, option = orjson.OPT_INDENT_2) + b"\n")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Bulk import users from an NDJSON or CSV file.")
+    parser.add_argument("path", help = "Input file, or - for stdin")
+    parser.add_argument("--format", choices = ("ndjson", "csv"), default = None,
+                        help = "Input format (defaults to csv for .csv files, ndjson otherwise)")
+    parser.add_argument("--batch-size", type = int, default = 1000, help = "Rows per COPY batch")
+    args = parser.parse_args()
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    sys.exit(asyncio.run(main(args.path, fmt, args.batch_size)))
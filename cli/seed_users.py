@@ -0,0 +1,217 @@
+"""
+Seed the database with synthetic users and refresh tokens for scale testing.
+
+Users get realistic names, locations and about texts and satisfy the `UserProfile` schema. Password
+hashing dominates any real signup, so each password class is hashed once with the configured scheme
+and cost and the hash is shared by every user of that class; user `user_id` logs in with
+`seed-password-{user_id % classes}`. Each user also gets a refresh token digest, minted through
+`core.security`, so the refresh token table and its indexes have a realistic size.
+
+User IDs are reserved up front by advancing the `users` sequence once, then worker processes
+generate disjoint ID ranges and stream them into `users` and `refreshaccesstokens` with COPY,
+committing every chunk. Meant for scale-testing databases: registrations running concurrently
+with the reservation itself may collide with the first seeded ID.
+
+Usage:
+    python -m cli.seed_users --rows 5000000 --workers 8
+    python -m cli.seed_users --rows 100000 --password-classes 1 --no-refresh-tokens
+"""
+import io
+import os
+import csv
+import sys
+import time
+import random
+import asyncio
+import argparse
+import multiprocessing
+import orjson
+from sqlalchemy import text
+from core.bootstrap import bootstrap_schema
+from core.database import engine
+from core.hashing import password_context
+from core.security import create_refresh_access_token, token_digest
+from schemas.user_schema import UserProfile
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+               "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+               "Amina", "Kwame", "Chidi", "Ngozi", "Aarav", "Priya", "Sita", "Ram", "Wei", "Mei", "Hiroshi", "Yuki",
+               "Luca", "Giulia", "Mateo", "Sofia", "Lukas", "Emma", "Olga", "Ivan"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Taylor", "Moore", "Jackson", "Martin", "Lee",
+              "Okafor", "Mensah", "Adeyemi", "Sharma", "Shrestha", "Gurung", "Thapa", "Wang", "Chen", "Tanaka",
+              "Rossi", "Silva", "Muller", "Schmidt", "Ivanov", "Kowalski", "Nielsen", "Dubois", "Haddad", "Khan"]
+CITIES = ["Kathmandu", "Pokhara", "Lalitpur", "Lagos", "Accra", "Nairobi", "London", "Berlin", "Paris", "New York",
+          "San Francisco", "Toronto", "Sydney", "Mumbai", "Delhi", "Singapore", "Tokyo", "Madrid", "Lisbon", "Cape Town",
+          "Cairo", "Dubai", "Sao Paulo", "Mexico City", "Seoul", "Warsaw", "Stockholm", "Chicago", "Austin", "Dublin"]
+ABOUT_PARTS = ["Software engineer", "Product designer", "Data analyst", "Student", "Teacher", "Photographer",
+               "Nurse", "Marketing lead", "Founder", "Researcher"]
+ABOUT_TAILS = ["who loves hiking.", "into open source.", "learning the guitar.", "and avid reader.",
+               "based remotely.", "and coffee enthusiast.", "who runs marathons.", "building side projects."]
+
+# Share of users without an about text, as allowed by the schema
+ABOUT_NULL_RATIO = 0.2
+
+COPY_USERS = "COPY users (user_id, name, email, location, about, password) FROM STDIN WITH (FORMAT csv)"
+COPY_REFRESH_TOKENS = "COPY refreshaccesstokens (token_digest, type, user_id) FROM STDIN WITH (FORMAT csv)"
+# Advances the sequence past the whole range in one statement; returns the last reserved ID
+RESERVE_IDS = """
+    SELECT setval(pg_get_serial_sequence('users', 'user_id'), nextval(pg_get_serial_sequence('users', 'user_id')) + :rows - 1)
+"""
+
+# Set in each worker process by init_worker
+_config = None
+
+
+def password_for(user_id: int, classes: int):
+    """
+    Return the plain password of a seeded user.
+    """
+    return f"seed-password-{user_id % classes}"
+
+
+def generate_users(start_id: int, count: int, config: dict):
+    """
+    Generate the rows of a chunk of users, deterministically for a given seed and ID range.
+
+    Returns:
+    - A list of (user_id, name, email, location, about, password hash) tuples.
+    """
+    rng = random.Random(config["seed"] * 1_000_003 + start_id)
+    hashes = config["hashes"]
+    rows = []
+    for user_id in range(start_id, start_id + count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        about = None if rng.random() < ABOUT_NULL_RATIO else f"{rng.choice(ABOUT_PARTS)} {rng.choice(ABOUT_TAILS)}"
+        email = f"{first.lower()}.{last.lower()}.{user_id}@{config['domain']}"
+        rows.append((user_id, f"{first} {last}", email, rng.choice(CITIES), about, hashes[user_id % len(hashes)]))
+    return rows
+
+
+async def mint_refresh_digests(user_ids):
+    # Tokens minted like login mints them, so the stored digests are shaped like real ones
+    return [token_digest(await create_refresh_access_token(data = { "id": user_id })) for user_id in user_ids]
+
+
+def init_worker(config: dict):
+    global _config
+    _config = config
+    # Connections inherited from the parent process must not be shared
+    engine.dispose(close = False)
+
+
+def seed_chunk(chunk):
+    """
+    Generate a chunk of users (and their refresh tokens) and COPY it in one transaction. Runs in a worker process.
+
+    - **chunk**: A (first user ID, number of users) tuple.
+
+    Returns:
+    - The number of users inserted.
+    """
+    start_id, count = chunk
+    rows = generate_users(start_id, count, _config)
+    # Guard against the generator drifting from the registration schema
+    _, name, email, location, about, _ = rows[0]
+    UserProfile(
+        name = name, email = email, location = location, about = about, password = password_for(start_id, len(_config["hashes"]))
+    )
+
+    users = io.StringIO()
+    csv.writer(users).writerows(rows)
+    users.seek(0)
+
+    tokens = None
+    if _config["refresh_tokens"]:
+        digests = asyncio.run(mint_refresh_digests([row[0] for row in rows]))
+        tokens = io.StringIO()
+        csv.writer(tokens).writerows((f"\\x{digest.hex()}", "Bearer", row[0]) for row, digest in zip(rows, digests))
+        tokens.seek(0)
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.copy_expert(COPY_USERS, users)
+        if tokens is not None:
+            cursor.copy_expert(COPY_REFRESH_TOKENS, tokens)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    return count
+
+
+def reserve_ids(rows: int):
+    """
+    Reserve a contiguous range of user IDs by advancing the users sequence past it.
+
+    Returns:
+    - The first reserved user ID.
+    """
+    with engine.begin() as connection:
+        last_id = connection.execute(text(RESERVE_IDS), { "rows": rows }).scalar()
+    return last_id - rows + 1
+
+
+def seed(rows: int, workers: int, chunk_size: int, classes: int, refresh_tokens: bool, domain: str, seed_value: int):
+    """
+    Seed `rows` users across `workers` processes, printing progress to stderr.
+
+    Returns:
+    - A report with the seeded ID range, the password classes and the throughput in rows per second.
+    """
+    bootstrap_schema()
+    hash_start = time.perf_counter()
+    hashes = [password_context.hash(password_for(index, classes)) for index in range(classes)]
+    hash_seconds = time.perf_counter() - hash_start
+
+    first_id = reserve_ids(rows)
+    chunks = [(start, min(chunk_size, first_id + rows - start)) for start in range(first_id, first_id + rows, chunk_size)]
+    config = { "hashes": hashes, "refresh_tokens": refresh_tokens, "domain": domain, "seed": seed_value }
+
+    start = time.perf_counter()
+    seeded = 0
+    engine.dispose()
+    with multiprocessing.Pool(workers, initializer = init_worker, initargs = (config,)) as pool:
+        for count in pool.imap_unordered(seed_chunk, chunks):
+            seeded += count
+            elapsed = time.perf_counter() - start
+            print(f"\r{seeded:,}/{rows:,} users, {seeded / elapsed:,.0f} rows/s", end = "", file = sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(file = sys.stderr)
+
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE users"))
+        connection.execute(text("ANALYZE refreshaccesstokens"))
+
+    return {
+        "users": seeded,
+        "refresh_tokens": seeded if refresh_tokens else 0,
+        "first_user_id": first_id,
+        "last_user_id": first_id + rows - 1,
+        "passwords": [password_for(index, classes) for index in range(classes)],
+        "password_hash_seconds": round(hash_seconds, 3),
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(seeded / elapsed),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Seed synthetic users for scale testing.")
+    parser.add_argument("--rows", type = int, default = 1000000, help = "Users to create")
+    parser.add_argument("--workers", type = int, default = os.cpu_count(), help = "Worker processes generating and copying rows")
+    parser.add_argument("--chunk-size", type = int, default = 10000, help = "Users per COPY transaction")
+    parser.add_argument("--password-classes", type = int, default = 4,
+                        help = "Distinct passwords, each hashed once and shared by every user of its class")
+    parser.add_argument("--no-refresh-tokens", dest = "refresh_tokens", action = "store_false",
+                        help = "Do not store refresh token digests for the seeded users")
+    parser.add_argument("--domain", default = "example.com", help = "Email domain of the seeded users")
+    parser.add_argument("--seed", type = int, default = 0, help = "Random seed for the generated profiles")
+    args = parser.parse_args()
+    if args.rows < 1 or args.workers < 1 or args.chunk_size < 1 or args.password_classes < 1:
+        parser.error("--rows, --workers, --chunk-size and --password-classes must be positive")
+
+    report = seed(args.rows, args.workers, args.chunk_size, args.password_classes, args.refresh_tokens, args.domain, args.seed)
+    sys.stdout.buffer.write(orjson.dumps(report, option = orjson.OPT_INDENT_2) + b"\n")
@@ -0,0 +1,57 @@
+import math
+import hashlib
+
+
+class BloomFilter:
+    """
+    A fixed-size Bloom filter: membership tests never miss an added item, but may report an item
+    that was never added with a probability bounded by `error_rate` while at most `capacity` items
+    have been added.
+
+    Attributes:
+    - **capacity**: Number of items the filter is sized for.
+    - **error_rate**: Target false-positive rate at capacity.
+    - **size**: Number of bits in the filter.
+    - **hashes**: Number of bit positions set per item.
+    - **count**: Number of items added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = max(math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / self.capacity * math.log(2)), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: two 64-bit halves of one digest generate all bit positions
+        data = item.encode() if isinstance(item, str) else item
+        digest = hashlib.blake2b(data, digest_size = 16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        """
+        Add an item (str or bytes) to the filter.
+        """
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def memory_bytes(self):
+        return len(self._bits)
+
+    def false_positive_rate(self):
+        """
+        Estimate the current false-positive rate from the number of items added.
+        """
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
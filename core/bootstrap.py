@@ -0,0 +1,181 @@
+import time
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from core.config import settings
+from core.database import engine
+from models.user_model import base
+
+# Version of the schema this code expects; bump it together with a new MIGRATIONS entry
+SCHEMA_VERSION = 7
+
+# Advisory lock key serializing schema changes across workers
+SCHEMA_LOCK_ID = 727073690
+
+# Statements run before create_all on every schema change, setting up what the declared tables rely on
+PREREQUISITES = [
+    # Trigram indexes for the user search; they are skipped, and search falls back to sequential scans,
+    # where the server does not ship the extension or the database user may not install it
+    """
+    DO $$
+    BEGIN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    EXCEPTION WHEN OTHERS THEN
+        RAISE WARNING 'pg_trgm is not available, user search will not be indexed: %', SQLERRM;
+    END
+    $$
+    """,
+]
+
+# Ordered (version, statements) pairs applied after create_all when upgrading past that version.
+# Statements must be idempotent, because a fresh database runs all of them after create_all.
+MIGRATIONS = [
+    (1, []),
+    (2, [
+        # Concurrent first logins could insert several refresh tokens per user before the owner was unique;
+        # keep only the newest one per user so the unique index can be built
+        """
+        DELETE FROM refreshaccesstokens older USING refreshaccesstokens newer
+        WHERE older.user_id = newer.user_id AND older.tokenid < newer.tokenid
+        """,
+        # Unique refresh token owner index, for tables created before it was declared
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_refreshaccesstokens_user_id ON refreshaccesstokens (user_id)",
+    ]),
+    (3, [
+        # Replace the raw refresh token column with its SHA-256 digest
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = 'refreshaccesstokens' AND column_name = 'tokens'
+            ) THEN
+                ALTER TABLE refreshaccesstokens ADD COLUMN IF NOT EXISTS token_digest bytea;
+                UPDATE refreshaccesstokens SET token_digest = sha256(convert_to(tokens, 'UTF8'));
+                DELETE FROM refreshaccesstokens WHERE token_digest IS NULL;
+                ALTER TABLE refreshaccesstokens ALTER COLUMN token_digest SET NOT NULL;
+                ALTER TABLE refreshaccesstokens DROP COLUMN tokens;
+            END IF;
+        END
+        $$
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_refreshaccesstokens_token_digest ON refreshaccesstokens (token_digest)",
+    ]),
+    # The revokedtokens table is created by create_all
+    (4, []),
+    (5, [
+        # Profile version behind the /me ETag
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 1",
+    ]),
+    (6, [
+        # Trigram indexes for the user search, for tables created before they were declared
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+                CREATE INDEX IF NOT EXISTS ix_users_name_trgm ON users USING gin (name gin_trgm_ops);
+                CREATE INDEX IF NOT EXISTS ix_users_location_trgm ON users USING gin (location gin_trgm_ops);
+            END IF;
+        END
+        $$
+        """,
+    ]),
+    (7, [
+        # Revocations per user, checked by the queued refresh token writes
+        "CREATE INDEX IF NOT EXISTS ix_revokedtokens_user_id_revoked_at ON revokedtokens (user_id, revoked_at)",
+    ]),
+]
+
+
+def create_database():
+    """
+    Create the configured database. Only used when connecting to it fails because it does not exist.
+    """
+    conn = psycopg2.connect(
+        dbname = "postgres", user = settings.DB_USER, password = settings.DB_PASSWORD,
+        host = settings.DB_HOST, port = settings.DB_PORT
+    )
+    conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)  # Allows database creation without a transaction
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_catalog.pg_database WHERE datname = %s", (settings.DB_NAME,))
+            if not cursor.fetchone():
+                cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(settings.DB_NAME)))
+                print(f"Database {settings.DB_NAME} created.")
+    finally:
+        conn.close()
+
+
+def _current_version(connection):
+    """
+    Read the applied schema version, 0 if the database has never been bootstrapped.
+    """
+    try:
+        return connection.execute(text("SELECT version FROM schema_version")).scalar() or 0
+    except ProgrammingError:
+        # The version table does not exist yet; clear the aborted transaction
+        connection.rollback()
+        return 0
+
+
+def bootstrap_schema():
+    """
+    Bring the database schema up to SCHEMA_VERSION.
+
+    In the common case this is a single version lookup on a pooled connection. DDL only runs when
+    the stored version is older, under a transaction-scoped advisory lock, so concurrently starting
+    workers apply it exactly once. The database itself is created only if connecting to it fails.
+
+    Returns:
+    - A report with the versions before and after, whether anything was created or migrated, and
+      how long the lock wait and the whole bootstrap took in milliseconds.
+    """
+    start = time.perf_counter()
+    report = { "database_created": False, "migrated": False, "lock_wait_ms": 0.0 }
+
+    try:
+        connection = engine.connect()
+    except OperationalError as e:
+        if "does not exist" not in str(e):
+            raise
+        create_database()
+        report["database_created"] = True
+        connection = engine.connect()
+
+    with connection:
+        version = _current_version(connection)
+        report["schema_version_before"] = version
+
+        if version < SCHEMA_VERSION:
+            connection.rollback()
+            with connection.begin():
+                lock_start = time.perf_counter()
+                connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), { "key": SCHEMA_LOCK_ID })
+                report["lock_wait_ms"] = (time.perf_counter() - lock_start) * 1000
+
+                # Another worker may have migrated while this one waited for the lock
+                connection.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version integer NOT NULL)"))
+                version = connection.execute(text("SELECT version FROM schema_version")).scalar() or 0
+                if version < SCHEMA_VERSION:
+                    for statement in PREREQUISITES:
+                        connection.execute(text(statement))
+                    base.metadata.create_all(bind = connection)
+                    for migration_version, statements in MIGRATIONS:
+                        if migration_version > version:
+                            for statement in statements:
+                                connection.execute(text(statement))
+                    connection.execute(text("DELETE FROM schema_version"))
+                    connection.execute(
+                        text("INSERT INTO schema_version (version) VALUES (:version)"), { "version": SCHEMA_VERSION }
+                    )
+                    report["migrated"] = True
+                    version = SCHEMA_VERSION
+        elif version > SCHEMA_VERSION:
+            print(f"Database schema version {version} is newer than this code expects ({SCHEMA_VERSION}).")
+
+        report["schema_version"] = version
+
+    report["duration_ms"] = (time.perf_counter() - start) * 1000
+    return report
@@ -0,0 +1,85 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    A bounded in-process cache with per-entry expiry and least-recently-used eviction.
+
+    Attributes:
+    - **maxsize**: Maximum number of entries kept; the least recently used entry is evicted first.
+    - **ttl**: Default time-to-live of an entry in seconds, used when `set` is not given one.
+    - **hits** / **misses** / **evictions**: Counters reported by `stats()`.
+    """
+
+    def __init__(self, maxsize: int, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for a key, or `default` if it is missing or expired.
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        """
+        Store a value, evicting the least recently used entries if the cache is full.
+
+        - **key**: The cache key.
+        - **value**: The value to store.
+        - **ttl**: Time-to-live in seconds; falls back to the cache default, `None` means no expiry.
+        """
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last = False)
+            self.evictions += 1
+
+    def pop(self, key, default=None):
+        """
+        Remove a key from the cache and return its value.
+        """
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """
+        Report the cache size and hit/miss/eviction counters.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
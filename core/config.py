@@ -1,3 +1,4 @@
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -16,6 +17,50 @@ class Settings(BaseSettings):
     TOKEN_CREATION_ALGORITHM: str  # Algorithm used for creating tokens (e.g., 'HS256')
     TOKEN_EXPIRY_LIMIT: int  # The expiry limit for access tokens in seconds
     REFRESH_TOKEN_SECRET: str  # Secret key used for creating and validating refresh tokens
+    REFRESH_TOKEN_EXPIRY_DAYS: int = 30  # Lifetime of refresh tokens; logging in issues a new one
+    DB_ASYNC: bool = False  # Use the asyncpg driver with AsyncEngine/AsyncSession for request handling
+    DB_READ_REPLICA_URLS: List[str] = []  # Read-replica database URLs (JSON list) serving read-only paths
+    TOKEN_KEYS: Dict[str, str] = {}  # Access token keys by kid: secrets (HS*) or PEM key file paths (ES256/RS256)
+    TOKEN_ACTIVE_KID: Optional[str] = None  # kid of the key signing new access tokens; unset signs with SECRET_KEY
+    TOKEN_CACHE_SIZE: int = 10000  # Maximum number of verified access tokens cached (0 disables the cache)
+    USER_CACHE_SIZE: int = 10000  # Maximum number of user profiles cached by the auth dependencies (0 disables the cache)
+    USER_CACHE_TTL_SECONDS: int = 60  # How long a cached user profile is served before it is reloaded
+    REVOCATION_BLOOM_CAPACITY: int = 100000  # Revoked tokens the in-process Bloom filter is sized for
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001  # Target false-positive rate of the revocation filter
+    REVOCATION_SYNC_SECONDS: float = 5  # How often each worker loads revocations made by other workers
+    REVOCATION_PRUNE_SECONDS: int = 300  # How often expired revocations are deleted and the filter rebuilt
+    EMAIL_FILTER_ENABLED: bool = False  # Answer logins for unregistered emails from an in-process Bloom filter instead of the database
+    EMAIL_FILTER_CAPACITY: int = 1000000  # Registered emails the email filter is sized for (grows to twice the user count)
+    EMAIL_FILTER_ERROR_RATE: float = 0.01  # Target false-positive rate of the email filter
+    EMAIL_FILTER_SYNC_SECONDS: float = 2  # How often each worker loads users registered by other workers
+    ADMIN_TOKEN: Optional[str] = None  # Shared secret for admin endpoints (X-Admin-Token header); unset disables them
+    BULK_IMPORT_BATCH_SIZE: int = 1000  # Rows hashed and copied into the database per bulk import batch
+    BULK_IMPORT_MAX_ERRORS: int = 1000  # Maximum number of per-row errors kept in a bulk import report
+    BULK_IMPORT_MAX_ROW_BYTES: int = 65536  # Longest bulk import row; longer ones are reported as malformed without being buffered
+    BULK_IMPORT_HASH_CONCURRENCY: int = 0  # Passwords bulk imports hash at once (0 uses half the hashing workers)
+    WARMUP_ENABLED: bool = True  # Warm up connections, JWT, hashing and hot queries before reporting ready
+    WARMUP_CONNECTIONS: int = 5  # Pooled connections opened per engine during warm-up (capped at the pool size)
+    LOGIN_RATE_LIMIT_ENABLED: bool = True  # Throttle login attempts per email and per client IP
+    LOGIN_ATTEMPTS_PER_EMAIL: int = 10  # Login attempts allowed per email within the window
+    LOGIN_ATTEMPTS_PER_IP: int = 100  # Login attempts allowed per client IP within the window
+    LOGIN_RATE_WINDOW_SECONDS: int = 60  # Length of the sliding login throttling window
+    LOGIN_RATE_MAX_KEYS: int = 100000  # Maximum emails/IPs tracked by each login limiter
+    LOGIN_TRUST_FORWARDED_FOR: bool = False  # Take the client IP from X-Forwarded-For (only behind a trusted proxy)
+    PASSWORD_HASH_SCHEME: str = "bcrypt"  # passlib scheme used for new password hashes
+    PASSWORD_HASH_ROUNDS: Optional[int] = None  # Cost of new password hashes; None keeps the scheme default
+    PASSWORD_HASH_CALIBRATE: bool = False  # Time a password hash at startup and report it against the target
+    PASSWORD_HASH_TARGET_MS: int = 250  # Target time per password hash used by the startup calibration
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # Worker pool used for password hashing: 'thread' or 'process'
+    PASSWORD_HASH_WORKERS: int = 0  # Number of hashing workers (0 uses the CPU count)
+    PASSWORD_HASH_QUEUE_SIZE: int = 64  # Hashing operations allowed to queue; logins and registrations beyond that get a 503
+    WRITE_QUEUE_DURABILITY: str = "sync"  # Login-side writes: 'inline' (commit in the request), 'sync' (wait for the group commit) or 'async' (queue and return, opt-in: queued writes die with the process)
+    WRITE_QUEUE_FLUSH_MS: int = 20  # Longest time a queued write waits before its group is committed
+    WRITE_QUEUE_MAX_BATCH: int = 500  # Queued writes that trigger a commit before WRITE_QUEUE_FLUSH_MS has passed
+    WRITE_QUEUE_MAX_PENDING: int = 10000  # Queued writes allowed before callers wait for room
+    PROFILING_ENABLED: bool = False  # Install the sampling request profiler and its admin endpoints (nothing is installed otherwise)
+    PROFILING_SAMPLE_RATE: float = 0.0  # Fraction of requests profiled without asking for it with the X-Profile header
+    PROFILING_INTERVAL_MS: float = 5  # Time between stack samples while a profiled request is in flight
+    PROFILING_MAX_PROFILES: int = 50  # Finished profiles kept in memory; the oldest are dropped
 
     class Config:
         """
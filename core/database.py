@@ -1,7 +1,12 @@
+from itertools import cycle
 from .config import settings
 from sqlalchemy import create_engine
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from .metrics import instrument_engine, TimedQueuePool, TimedAsyncAdaptedQueuePool
 
 # Extract database configuration values from settings
 password = settings.DB_PASSWORD
@@ -14,15 +19,58 @@ port = settings.DB_PORT
 database_url = f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}"
 
 # Create an SQLAlchemy engine with connection pooling and automatic pre-ping to detect stale connections
-engine = create_engine(database_url, pool_pre_ping=True)
+# The sync engine is always available; schema creation and other blocking maintenance work use it
+# Statement counts/timings and pool checkout waits are recorded by core.metrics
+engine = instrument_engine(create_engine(database_url, pool_pre_ping=True, poolclass=TimedQueuePool))
 
-# Create a session factory bound to the engine, with autocommit disabled
-session = sessionmaker(autocommit=False, bind=engine)
+# Create a session factory bound to the engine, with autocommit disabled. Objects are not expired on
+# commit, so reading attributes never triggers an implicit reload outside the threadpool.
+session = sessionmaker(autocommit=False, bind=engine, expire_on_commit=False)
+
+# Async engine and session factory, only created when DB_ASYNC is enabled
+async_database_url = f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{database}"
+async_engine = None
+async_session = None
+if settings.DB_ASYNC:
+    async_engine = create_async_engine(async_database_url, pool_pre_ping=True, poolclass=TimedAsyncAdaptedQueuePool)
+    instrument_engine(async_engine.sync_engine)
+    # Objects are not expired on commit, so attributes never trigger an implicit (blocking) reload
+    async_session = async_sessionmaker(async_engine, autocommit=False, expire_on_commit=False)
+
+def _replica_url(url: str, driver: str):
+    # Replica URLs may be given with any postgres driver name; use the one matching the engine
+    return make_url(url).set(drivername=driver)
+
+# Read-replica engines and session factories; read-only dependencies fall back to the primary without replicas
+replica_engines = [
+    instrument_engine(create_engine(
+        _replica_url(url, "postgresql+psycopg2"), pool_pre_ping=True, poolclass=TimedQueuePool
+    ))
+    for url in settings.DB_READ_REPLICA_URLS
+]
+read_sessions = cycle([
+    sessionmaker(autocommit=False, bind=replica, expire_on_commit=False) for replica in replica_engines
+] or [session])
+
+async_replica_engines = []
+async_read_sessions = None
+if settings.DB_ASYNC:
+    async_replica_engines = [
+        create_async_engine(
+            _replica_url(url, "postgresql+asyncpg"), pool_pre_ping=True, poolclass=TimedAsyncAdaptedQueuePool
+        )
+        for url in settings.DB_READ_REPLICA_URLS
+    ]
+    for replica in async_replica_engines:
+        instrument_engine(replica.sync_engine)
+    async_read_sessions = cycle([
+        async_sessionmaker(replica, autocommit=False, expire_on_commit=False) for replica in async_replica_engines
+    ] or [async_session])
 
 # Define a base class for declarative class definitions
 base = declarative_base()
 
-def get_db():
+def get_sync_db():
     """
     Dependency to provide a SQLAlchemy database session.
 
@@ -38,3 +86,86 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """
+    Dependency to provide an async SQLAlchemy database session.
+
+    Yields:
+    - An AsyncSession that can be used within a request, and ensures that the session is closed
+      after the request is completed.
+    """
+    async with async_session() as db:
+        yield db
+
+def get_sync_read_db():
+    """
+    Dependency to provide a read-only SQLAlchemy database session.
+
+    Sessions are handed out round-robin across the configured read replicas, or bound to the primary
+    when there are none. Only use it for pure reads that tolerate replication lag; writes and
+    read-after-write flows must use `get_db`.
+
+    Yields:
+    - A database session that is closed after the request is completed.
+    """
+    db = next(read_sessions)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db():
+    """
+    Dependency to provide a read-only async SQLAlchemy database session, see `get_sync_read_db`.
+
+    Yields:
+    - An AsyncSession that is closed after the request is completed.
+    """
+    async with next(async_read_sessions)() as db:
+        yield db
+
+# The session dependencies used by the API, selected by the DB_ASYNC setting
+get_db = get_async_db if settings.DB_ASYNC else get_sync_db
+get_read_db = get_async_read_db if settings.DB_ASYNC else get_sync_read_db
+
+async def execute(db, statement):
+    """
+    Execute a statement on either a sync Session or an AsyncSession.
+
+    Sync sessions block on psycopg2, so their calls here and in `commit`, `rollback` and `refresh` run in
+    the threadpool rather than on the event loop.
+
+    - **db**: The database session.
+    - **statement**: The SQLAlchemy statement to execute.
+
+    Returns:
+    - The statement result.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.execute(statement)
+    return await run_in_threadpool(db.execute, statement)
+
+async def commit(db):
+    """
+    Commit the current transaction on either a sync Session or an AsyncSession.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.commit()
+    return await run_in_threadpool(db.commit)
+
+async def rollback(db):
+    """
+    Roll back the current transaction on either a sync Session or an AsyncSession.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.rollback()
+    return await run_in_threadpool(db.rollback)
+
+async def refresh(db, instance):
+    """
+    Refresh the attributes of an instance on either a sync Session or an AsyncSession.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.refresh(instance)
+    return await run_in_threadpool(db.refresh, instance)
@@ -0,0 +1,222 @@
+import time
+import asyncio
+from collections import deque
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, func, text
+from core.bloom import BloomFilter
+from core.config import settings
+from core.database import engine
+from models.user_model import UserProfile
+
+# Rows fetched per round-trip while streaming the email column
+BUILD_BATCH_SIZE = 10000
+
+# User IDs are assigned before a registration commits, so a user with a lower ID can become visible
+# after a sync has moved past it. Each sync therefore re-reads the users above the highest ID seen by an
+# earlier sync until every transaction that was running at that sync has ended, and for at least this
+# long, which covers IDs reserved ahead of the transaction inserting them (cli.seed_users)
+SYNC_OVERLAP_SECONDS = 30
+
+# Oldest and next transaction IDs of the current snapshot: every transaction below the first has ended
+SNAPSHOT_XMIN = text("SELECT CAST(CAST(pg_snapshot_xmin(pg_current_snapshot()) AS text) AS bigint)")
+SNAPSHOT_XMAX = text("SELECT CAST(CAST(pg_snapshot_xmax(pg_current_snapshot()) AS text) AS bigint)")
+
+# Seconds between checks while the build waits for older transactions to end
+BUILD_SETTLE_POLL_SECONDS = 0.1
+
+# Syncs that may fail in a row before misses are no longer trusted
+STALE_AFTER_SYNCS = 3
+
+# Misses waiting for a confirmation lookup, and emails per lookup query
+MAX_PENDING_LOOKUPS = 1000
+LOOKUP_BATCH_SIZE = 500
+
+
+class EmailFilter:
+    """
+    Bloom filter of registered emails, answering "definitely not registered" without a query.
+
+    The filter is built in the background at startup by streaming the `email` column through a
+    server-side cursor; until it is ready every email is treated as possibly registered. Emails
+    registered or imported by this process are added immediately, and those registered by other
+    workers are picked up every EMAIL_FILTER_SYNC_SECONDS by reading users past the highest user ID
+    that is known to have no uncommitted users below it. Users are never deleted, so the filter never
+    forgets an email.
+
+    A user registered by another worker is therefore reported as unregistered until the next sync,
+    for up to EMAIL_FILTER_SYNC_SECONDS. When syncs keep failing, the filter is stale and misses are
+    confirmed on the primary instead, batched with at most one lookup in flight.
+
+    Attributes:
+    - **capacity**: Minimum number of emails the filter is sized for.
+    - **error_rate**: Target false-positive rate of the filter.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.filter = None
+        self.max_user_id = 0
+        self.synced_at = None
+        # (time, next transaction ID, highest user ID seen) after the build and each sync; reads start
+        # past the highest user ID of the first entry
+        self._history = deque()
+        # Missed emails waiting for the next lookup, the future of that lookup and the lock serializing lookups
+        self._misses = set()
+        self._next_lookup = None
+        self._lookup_lock = asyncio.Lock()
+
+    @property
+    def ready(self):
+        return self.filter is not None
+
+    @property
+    def stale(self):
+        """
+        Whether the last successful sync is several sync intervals old, so misses may be outdated.
+        """
+        return (
+            self.synced_at is None
+            or time.monotonic() - self.synced_at > STALE_AFTER_SYNCS * settings.EMAIL_FILTER_SYNC_SECONDS
+        )
+
+    async def might_exist(self, email: str):
+        """
+        Return False only if the email is not registered, or was registered by another worker since
+        the last sync. While the filter is stale, misses are confirmed on the primary.
+        """
+        if self.filter is None or email in self.filter:
+            return True
+        if not self.stale:
+            return False
+
+        if len(self._misses) >= MAX_PENDING_LOOKUPS:
+            return True
+        self._misses.add(email)
+        if self._next_lookup is None:
+            self._next_lookup = asyncio.ensure_future(self._lookup_misses())
+        try:
+            found = await asyncio.shield(self._next_lookup)
+        except Exception as e:
+            print(f"Email filter lookup failed, treating the email as registered: {e}")
+            return True
+        return email in found
+
+    async def _lookup_misses(self):
+        async with self._lookup_lock:
+            # Misses arriving from now on go into the next lookup
+            emails, self._misses, self._next_lookup = list(self._misses), set(), None
+            found = await run_in_threadpool(self._lookup, emails)
+        for email in found:
+            self.filter.add(email)
+        return found
+
+    def _lookup(self, emails):
+        found = set()
+        with engine.connect() as connection:
+            for start in range(0, len(emails), LOOKUP_BATCH_SIZE):
+                found.update(connection.execute(select(UserProfile.email).where(
+                    UserProfile.email.in_(emails[start:start + LOOKUP_BATCH_SIZE])
+                )).scalars())
+        return found
+
+    def add(self, email: str):
+        """
+        Record a newly registered email. A no-op until the filter has been built, which includes it anyway.
+        """
+        if self.filter is not None:
+            self.filter.add(email)
+
+    def build(self):
+        """
+        Build the filter from every registered email. Blocking.
+        """
+        with engine.connect() as connection:
+            # Users up to the current highest ID are all visible to the build once every transaction
+            # running now has ended; wait for that, but not longer than the sync overlap
+            floor = connection.execute(select(func.coalesce(func.max(UserProfile.user_id), 0))).scalar()
+            floor_xmax = connection.execute(SNAPSHOT_XMAX).scalar()
+            deadline = time.monotonic() + SYNC_OVERLAP_SECONDS
+            while connection.execute(SNAPSHOT_XMIN).scalar() < floor_xmax and time.monotonic() < deadline:
+                time.sleep(BUILD_SETTLE_POLL_SECONDS)
+
+            count = connection.execute(select(func.count()).select_from(UserProfile)).scalar()
+            bloom = BloomFilter(max(self.capacity, 2 * count), self.error_rate)
+            max_user_id = floor
+            result = connection.execution_options(yield_per = BUILD_BATCH_SIZE).execute(
+                select(UserProfile.user_id, UserProfile.email).order_by(UserProfile.user_id)
+            )
+            for user_id, email in result:
+                bloom.add(email)
+                max_user_id = max(max_user_id, user_id)
+            xmax = connection.execute(SNAPSHOT_XMAX).scalar()
+
+        now = time.monotonic()
+        self.max_user_id = max_user_id
+        self._history = deque([(now, floor_xmax, floor), (now, xmax, max_user_id)])
+        self.filter = bloom
+        # Pick up users registered while the filter was being built
+        self.sync()
+
+    def sync(self):
+        """
+        Add users registered since the last build or sync (by any worker) to the filter. Blocking.
+        """
+        now = time.monotonic()
+        with engine.connect() as connection:
+            xmin = connection.execute(SNAPSHOT_XMIN).scalar()
+            rows = connection.execute(select(UserProfile.user_id, UserProfile.email).where(
+                UserProfile.user_id > self._history[0][2]
+            ).order_by(UserProfile.user_id)).all()
+            xmax = connection.execute(SNAPSHOT_XMAX).scalar()
+        for user_id, email in rows:
+            if email not in self.filter:
+                self.filter.add(email)
+            self.max_user_id = max(self.max_user_id, user_id)
+
+        # Users up to the highest ID of an earlier sync have all been read once every transaction running
+        # at that sync had ended before this read began
+        while (
+            len(self._history) > 1 and self._history[1][1] <= xmin
+            and self._history[1][0] <= now - SYNC_OVERLAP_SECONDS
+        ):
+            self._history.popleft()
+        self._history.append((now, xmax, self.max_user_id))
+        self.synced_at = time.monotonic()
+
+    async def run(self):
+        """
+        Background task building the filter and then keeping it in sync until cancelled.
+        """
+        try:
+            await run_in_threadpool(self.build)
+        except Exception as e:
+            print(f"Email filter build failed, login lookups always query the database: {e}")
+            return
+        while True:
+            await asyncio.sleep(settings.EMAIL_FILTER_SYNC_SECONDS)
+            try:
+                await run_in_threadpool(self.sync)
+            except Exception as e:
+                print(f"Email filter sync failed: {e}")
+
+    def stats(self):
+        """
+        Report the size of the filter.
+
+        Returns:
+        - A dictionary with whether the filter is ready, the number of emails in it, its memory
+          footprint and its estimated false-positive rate.
+        """
+        if self.filter is None:
+            return { "ready": False }
+        return {
+            "ready": True,
+            "entries": len(self.filter),
+            "memory_bytes": self.filter.memory_bytes,
+            "false_positive_rate": self.filter.false_positive_rate(),
+        }
+
+
+# Shared email filter, only consulted when EMAIL_FILTER_ENABLED is set
+email_filter = EmailFilter(settings.EMAIL_FILTER_CAPACITY, settings.EMAIL_FILTER_ERROR_RATE)
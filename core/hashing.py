@@ -0,0 +1,240 @@
+import os
+import math
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from passlib.context import CryptContext
+from core.config import settings
+from core.metrics import password_hash_duration, password_hash_queue_wait
+
+
+def build_password_context(scheme: str = "bcrypt", rounds: int = None):
+    """
+    Build the CryptContext used for password hashing and verification.
+
+    - **scheme**: The passlib scheme new hashes are created with.
+    - **rounds**: The cost for new hashes, or None for the scheme's default. Hashes created with any
+      other cost are reported by `needs_update`, so they are rehashed on the next successful login.
+
+    Returns:
+    - A CryptContext that still verifies bcrypt hashes when a different scheme is configured.
+    """
+    schemes = [scheme] if scheme == "bcrypt" else [scheme, "bcrypt"]
+    options = {}
+    if rounds is not None:
+        options = {
+            f"{scheme}__default_rounds": rounds, f"{scheme}__min_rounds": rounds, f"{scheme}__max_rounds": rounds
+        }
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+
+# Initialize CryptContext for password hashing and verification. It is built from settings at import
+# time, so process pool workers end up with the same configuration.
+password_context = build_password_context(settings.PASSWORD_HASH_SCHEME, settings.PASSWORD_HASH_ROUNDS)
+
+
+def _timed(func, *args):
+    """
+    Run a hashing function and measure how long it took inside the worker.
+
+    Module-level so it can be pickled into a process pool.
+
+    Returns:
+    - A tuple of the function result and the run time in seconds.
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def _hash(password: str):
+    return password_context.hash(password)
+
+
+def _verify(plain_pwd: str, hash_pwd: str):
+    return password_context.verify(plain_pwd, hash_pwd)
+
+
+def _verify_and_update(plain_pwd: str, hash_pwd: str):
+    return password_context.verify_and_update(plain_pwd, hash_pwd)
+
+
+def calibrate(target_ms: float, samples: int = 3):
+    """
+    Measure how long hashing a password takes on this host with the configured scheme and cost.
+
+    - **target_ms**: The desired time per hash in milliseconds.
+    - **samples**: Number of hashes timed; the fastest one is reported.
+
+    Returns:
+    - A report with the scheme, the configured rounds, the measured and target times and the
+      rounds that would come closest to the target.
+    """
+    handler = password_context.handler()
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        password_context.hash("calibration-password")
+        timings.append((time.perf_counter() - start) * 1000)
+    measured_ms = min(timings)
+
+    rounds = getattr(handler, "default_rounds", None)
+    suggested_rounds = rounds
+    if rounds and measured_ms > 0:
+        if getattr(handler, "rounds_cost", "linear") == "log2":
+            # Each extra round doubles the work
+            suggested_rounds = rounds + round(math.log2(target_ms / measured_ms))
+        else:
+            suggested_rounds = round(rounds * target_ms / measured_ms)
+        if getattr(handler, "min_rounds", None) is not None:
+            suggested_rounds = max(suggested_rounds, handler.min_rounds)
+        if getattr(handler, "max_rounds", None) is not None:
+            suggested_rounds = min(suggested_rounds, handler.max_rounds)
+
+    return {
+        "scheme": handler.name,
+        "rounds": rounds,
+        "measured_ms": measured_ms,
+        "target_ms": target_ms,
+        "suggested_rounds": suggested_rounds,
+    }
+
+
+class HashingOverloaded(Exception):
+    """
+    Raised when every slot of the hashing executor is taken and the caller did not ask to wait.
+    """
+
+
+class HashingExecutor:
+    """
+    Runs password hashing and verification in a bounded worker pool, off the event loop.
+
+    At most `workers + queue_size` operations are submitted to the pool at once. Once all of them
+    are taken, further operations fail fast with HashingOverloaded, so login and registration bursts
+    are shed instead of piling up unbounded waiters. Background callers that bound their own
+    concurrency (such as bulk imports) may pass `wait=True` to wait for a slot instead.
+
+    Attributes:
+    - **kind**: Either "thread" or "process".
+    - **workers**: Number of pool workers.
+    - **queue_size**: Number of operations allowed to queue behind busy workers.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 0, queue_size: int = 64):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown hashing executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self._pool = None
+        self._slots = asyncio.Semaphore(self.workers + self.queue_size)
+
+        # Counters reported by stats()
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_latency = 0.0
+        self.total_run_time = 0.0
+        self.max_latency = 0.0
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers = self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers = self.workers, thread_name_prefix = "hashing")
+        return self._pool
+
+    async def _submit(self, operation: str, func, *args, wait: bool = False):
+        if not wait and self._slots.locked():
+            self.rejected += 1
+            raise HashingOverloaded("Password hashing queue is full.")
+
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, run_time = await loop.run_in_executor(self._get_pool(), _timed, func, *args)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+        latency = time.perf_counter() - start
+        self.completed += 1
+        self.total_latency += latency
+        self.total_run_time += run_time
+        self.max_latency = max(self.max_latency, latency)
+        password_hash_duration.observe(run_time, operation)
+        password_hash_queue_wait.observe(latency - run_time, operation)
+        return result
+
+    async def hash(self, password: str, wait: bool = False):
+        """
+        Hash a plaintext password in the worker pool.
+
+        - **wait**: Wait for a free slot instead of raising HashingOverloaded when the executor is full.
+        """
+        return await self._submit("hash", _hash, password, wait = wait)
+
+    async def verify(self, plain_pwd: str, hash_pwd: str):
+        """
+        Verify a plaintext password against a hash in the worker pool.
+        """
+        return await self._submit("verify", _verify, plain_pwd, hash_pwd)
+
+    async def verify_and_update(self, plain_pwd: str, hash_pwd: str):
+        """
+        Verify a plaintext password in the worker pool, rehashing it if the hash is outdated.
+
+        Returns:
+        - A tuple of whether the password matches and the replacement hash, or None if the hash is current.
+        """
+        return await self._submit("verify", _verify_and_update, plain_pwd, hash_pwd)
+
+    def stats(self):
+        """
+        Report queue depth and latency numbers for the executor.
+
+        Returns:
+        - A dictionary with the current queue depth, in-flight, completed and rejected counts and
+          average/maximum latencies in milliseconds. Queue wait is the part of the latency not spent hashing.
+        """
+        completed = self.completed or 1
+        avg_latency = self.total_latency / completed
+        avg_run_time = self.total_run_time / completed
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "capacity": self.workers + self.queue_size,
+            "queue_depth": self.waiting + max(self.in_flight - self.workers, 0),
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_latency_ms": avg_latency * 1000,
+            "avg_queue_wait_ms": (avg_latency - avg_run_time) * 1000,
+            "max_latency_ms": self.max_latency * 1000,
+        }
+
+    def shutdown(self):
+        """
+        Shut down the worker pool, waiting for running operations to finish.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait = True)
+            self._pool = None
+
+
+# Shared executor used by the password helpers in core.security
+hashing_executor = HashingExecutor(
+    kind = settings.PASSWORD_HASH_EXECUTOR,
+    workers = settings.PASSWORD_HASH_WORKERS,
+    queue_size = settings.PASSWORD_HASH_QUEUE_SIZE,
+)
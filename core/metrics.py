@@ -0,0 +1,291 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# Default latency buckets in seconds, from sub-millisecond cache hits to multi-second bcrypt queues
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    """
+    A monotonically increasing value, optionally split by labels.
+    """
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+
+    def inc(self, amount: float = 1.0, *label_values):
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def samples(self):
+        for label_values, value in self._values.items():
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Gauge(Counter):
+    """
+    A value that can go up and down, optionally split by labels.
+    """
+    type = "gauge"
+
+    def dec(self, amount: float = 1.0, *label_values):
+        self.inc(-amount, *label_values)
+
+    def set(self, value: float, *label_values):
+        self._values[label_values] = value
+
+
+class Histogram:
+    """
+    Observations counted into cumulative buckets, optionally split by labels.
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def observe(self, value: float, *label_values):
+        series = self._values.get(label_values)
+        if series is None:
+            # Per-bucket counts (plus +Inf), sum and count
+            series = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self):
+        for label_values, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket", _format_labels(self.labels + ("le",), label_values + (le,)), cumulative
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class Registry:
+    """
+    Holds metrics and renders them in the Prometheus text exposition format.
+
+    Collectors are callables run at scrape time that refresh gauges from other components
+    (cache sizes, queue depths), so those components pay nothing per request.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", labels = ("method", "route", "status")
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served."
+))
+db_queries = registry.register(Counter(
+    "db_queries_total", "SQL statements executed."
+))
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time."
+))
+db_queries_per_request = registry.register(Histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request, by route.", labels = ("route",),
+    buckets = (0, 1, 2, 3, 5, 10, 25, 50)
+))
+db_time_per_request = registry.register(Histogram(
+    "db_time_per_request_seconds", "Time spent in SQL statements per HTTP request, by route.", labels = ("route",)
+))
+db_pool_checkout_wait = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection."
+))
+password_hash_duration = registry.register(Histogram(
+    "password_hash_duration_seconds", "Time spent hashing or verifying a password in a worker.", labels = ("operation",)
+))
+password_hash_queue_wait = registry.register(Histogram(
+    "password_hash_queue_wait_seconds", "Time a hashing operation waited for a worker.", labels = ("operation",)
+))
+cache_entries = registry.register(Gauge(
+    "cache_entries", "Entries held by an in-process cache.", labels = ("cache",)
+))
+cache_hits = registry.register(Gauge(
+    "cache_hits_total", "Lookups served by an in-process cache.", labels = ("cache",)
+))
+cache_misses = registry.register(Gauge(
+    "cache_misses_total", "Lookups missed by an in-process cache.", labels = ("cache",)
+))
+password_hash_queue_depth = registry.register(Gauge(
+    "password_hash_queue_depth", "Hashing operations waiting for a worker."
+))
+bloom_filter_entries = registry.register(Gauge(
+    "bloom_filter_entries", "Items added to an in-process Bloom filter.", labels = ("filter",)
+))
+bloom_filter_memory_bytes = registry.register(Gauge(
+    "bloom_filter_memory_bytes", "Memory held by the bit array of an in-process Bloom filter.", labels = ("filter",)
+))
+bloom_filter_false_positive_rate = registry.register(Gauge(
+    "bloom_filter_false_positive_rate", "Estimated false-positive rate of an in-process Bloom filter.", labels = ("filter",)
+))
+write_queue_depth = registry.register(Gauge(
+    "write_queue_depth", "Writes waiting in the group-commit write queue."
+))
+write_queue_batch_rows = registry.register(Histogram(
+    "write_queue_batch_rows", "Writes committed per write queue flush.", buckets = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+))
+write_queue_flush_duration = registry.register(Histogram(
+    "write_queue_flush_duration_seconds", "Time spent executing and committing a write queue flush."
+))
+startup_duration = registry.register(Gauge(
+    "startup_duration_seconds", "Time spent in each application startup phase.", labels = ("phase",)
+))
+
+
+class RequestStats:
+    """
+    Per-request database counters, carried in a context variable.
+    """
+    __slots__ = ("queries", "query_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+
+
+request_stats: ContextVar = ContextVar("request_stats", default = None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"]
+    db_queries.inc()
+    db_query_duration.observe(elapsed)
+    stats = request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_time += elapsed
+
+
+def instrument_engine(engine):
+    """
+    Count SQL statements and their execution time on an engine.
+
+    - **engine**: A sync Engine (use `AsyncEngine.sync_engine` for async engines).
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool recording how long each checkout waited for a connection.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - start)
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool recording how long each checkout waited for a connection.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, in-flight requests and per-request database work.
+
+    Routes are labelled by their path template, so path parameters do not create new series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec()
+            request_stats.reset(token)
+
+            route = scope.get("route")
+            if route is not None:
+                path = route.path
+            elif "endpoint" in scope:
+                path = scope["path"]
+            else:
+                path = "<unmatched>"
+            http_request_duration.observe(elapsed, scope["method"], path, status[0])
+            db_queries_per_request.observe(stats.queries, path)
+            db_time_per_request.observe(stats.query_time, path)
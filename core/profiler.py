@@ -0,0 +1,253 @@
+import sys
+import time
+import hmac
+import random
+import threading
+from itertools import count
+from collections import deque
+from os.path import basename
+from core.config import settings
+
+# Header asking for a profile of the request; only honoured together with a valid X-Admin-Token
+PROFILE_HEADER = b"x-profile"
+ADMIN_HEADER = b"x-admin-token"
+
+# Leaf frames of threads that are parked rather than working: the event loop waiting in select(),
+# threadpool workers waiting for a job and the password hashing workers waiting on their queue
+IDLE_FRAMES = {("selectors.py", "select"), ("threading.py", "wait"), ("thread.py", "_worker")}
+
+# Deepest stack recorded per sample
+MAX_STACK_DEPTH = 128
+
+
+def _stack(frame):
+    # (function, file, first line) tuples from the outermost frame to the innermost
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        stack.append((code.co_qualname, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _idle(stack):
+    return not stack or (basename(stack[-1][1]), stack[-1][0].rsplit(".", 1)[-1]) in IDLE_FRAMES
+
+
+class Profile:
+    """
+    Sampled stacks of one request, aggregated by thread and stack.
+
+    Attributes:
+    - **id**: Sequential profile ID.
+    - **method**, **path**: The request line; `path` becomes the route template once the request is routed.
+    - **started_at**: Wall-clock start time (Unix seconds).
+    - **duration_ms**: Request duration, set when the request completes.
+    - **status**: Response status code.
+    - **samples**: Mapping of (thread name, stack) to [sample count, sampled milliseconds].
+    """
+
+    def __init__(self, profile_id: int, method: str, path: str):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.duration_ms = None
+        self.status = None
+        self.samples = {}
+
+    def add(self, thread: str, stack, weight_ms: float):
+        entry = self.samples.get((thread, stack))
+        if entry is None:
+            self.samples[(thread, stack)] = [1, weight_ms]
+        else:
+            entry[0] += 1
+            entry[1] += weight_ms
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "samples": sum(entry[0] for entry in self.samples.values()),
+        }
+
+    def folded(self):
+        """
+        Render the profile in the folded stack format of flamegraph.pl (also readable by speedscope):
+        one `thread;outer;...;inner milliseconds` line per stack.
+        """
+        lines = []
+        for (thread, stack), (_, weight_ms) in sorted(self.samples.items()):
+            frames = ";".join(f"{name} ({basename(filename)}:{line})" for name, filename, line in stack)
+            lines.append(f"{thread};{frames} {max(round(weight_ms), 1)}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self):
+        """
+        Render the profile as a speedscope file, with one sampled profile per thread.
+        """
+        frames = []
+        frame_index = {}
+        threads = {}
+        for (thread, stack), (_, weight_ms) in self.samples.items():
+            indices = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({ "name": frame[0], "file": frame[1], "line": frame[2] })
+                indices.append(frame_index[frame])
+            samples, weights = threads.setdefault(thread, ([], []))
+            samples.append(indices)
+            weights.append(weight_ms)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.method} {self.path} #{self.id}",
+            "activeProfileIndex": 0,
+            "shared": { "frames": frames },
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": thread,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+                for thread, (samples, weights) in sorted(threads.items())
+            ],
+        }
+
+
+class Profiler:
+    """
+    Statistical profiler for individual requests.
+
+    While at least one profiled request is in flight, a background thread snapshots the stacks of all
+    threads (`sys._current_frames()`) every `interval_ms` and adds the non-idle ones to every active
+    profile, weighted by the time since the previous snapshot. This covers the event loop as well as the
+    threadpool and hashing workers the request hands work to, but concurrent requests share those
+    threads, so profiles are sharpest when the profiled request runs alone. Finished profiles are kept
+    in a ring buffer of `max_profiles`.
+
+    Attributes:
+    - **interval_ms**: Time between stack snapshots; CPU-bound threads holding the GIL can stretch it.
+    - **max_profiles**: Number of finished profiles kept.
+    """
+
+    def __init__(self, interval_ms: float, max_profiles: int):
+        self.interval_ms = interval_ms
+        self.profiles = deque(maxlen = max_profiles)
+        self._ids = count(1)
+        self._active = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, method: str, path: str):
+        """
+        Start profiling a request, starting the sampling thread if it is not running.
+
+        Returns:
+        - The new Profile.
+        """
+        profile = Profile(next(self._ids), method, path)
+        with self._lock:
+            self._active.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target = self._sample, name = "profiler", daemon = True)
+                self._thread.start()
+        return profile
+
+    def stop(self, profile: Profile):
+        """
+        Stop profiling a request and store its profile. The sampling thread exits once no profile is active.
+        """
+        with self._lock:
+            self._active.discard(profile)
+        self.profiles.append(profile)
+
+    def get(self, profile_id: int):
+        return next((profile for profile in self.profiles if profile.id == profile_id), None)
+
+    def _sample(self):
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while True:
+            time.sleep(self.interval_ms / 1000)
+            now = time.perf_counter()
+            weight_ms = (now - last) * 1000
+            last = now
+            names = { thread.ident: thread.name for thread in threading.enumerate() }
+            frames = sys._current_frames()
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    stack = _stack(frame)
+                    if _idle(stack):
+                        continue
+                    for profile in self._active:
+                        profile.add(names.get(ident, str(ident)), stack, weight_ms)
+            del frames
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests that ask for it with an `X-Profile` header (plus a valid
+    `X-Admin-Token`) and a random `sample_rate` fraction of all other requests. The ID of the profile
+    is returned in the `X-Profile-Id` response header.
+
+    Only installed when PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, app, profiler: Profiler, sample_rate: float = 0.0, exclude_prefix: str = None):
+        self.app = app
+        self.profiler = profiler
+        self.sample_rate = sample_rate
+        self.exclude_prefix = exclude_prefix
+
+    def _wanted(self, scope):
+        if self.exclude_prefix and scope["path"].startswith(self.exclude_prefix):
+            return False
+        headers = dict(scope["headers"])
+        if PROFILE_HEADER in headers:
+            # Compare bytes: compare_digest rejects str arguments with non-ASCII characters
+            return bool(settings.ADMIN_TOKEN) and hmac.compare_digest(
+                headers.get(ADMIN_HEADER, b""), settings.ADMIN_TOKEN.encode()
+            )
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+
+        profile = self.profiler.start(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", str(profile.id).encode())]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.duration_ms = (time.perf_counter() - start) * 1000
+            route = scope.get("route")
+            if route is not None:
+                profile.path = route.path
+            self.profiler.stop(profile)
+
+
+# Shared profiler, only used when PROFILING_ENABLED is set
+profiler = Profiler(settings.PROFILING_INTERVAL_MS, settings.PROFILING_MAX_PROFILES)
@@ -0,0 +1,148 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from core.bloom import BloomFilter
+from core.config import settings
+from core.database import engine, execute
+from models.user_model import RevokedTokens
+
+# Revocations are timestamped when their transaction starts, so each sync re-reads this window to
+# catch transactions that committed after the previous sync
+SYNC_OVERLAP = timedelta(seconds = 30)
+
+
+def revoked_statement(jti: str):
+    """
+    Select a revoked token ID, confirming a Bloom filter hit.
+    """
+    return select(RevokedTokens.jti).where(RevokedTokens.jti == jti)
+
+
+class RevocationList:
+    """
+    Denylist of revoked access tokens, keyed by their `jti` claim.
+
+    Revocations are stored in the `revokedtokens` table until the token would have expired anyway.
+    Every process keeps a Bloom filter of the revoked IDs, so checking a token that was never revoked
+    (almost every request) needs no database query; only filter hits are confirmed against the table.
+    The filter is topped up with other workers' revocations every REVOCATION_SYNC_SECONDS and rebuilt
+    after expired rows are pruned every REVOCATION_PRUNE_SECONDS.
+
+    Attributes:
+    - **capacity**: Minimum number of revocations the filter is sized for.
+    - **error_rate**: Target false-positive rate of the filter.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.filter = BloomFilter(capacity, error_rate)
+        self.synced_until = None
+
+    async def is_revoked(self, jti: str, db: Session):
+        """
+        Check whether a token ID has been revoked.
+
+        - **jti**: The token ID.
+        - **db**: The database session used to confirm a filter hit (sync Session or AsyncSession).
+
+        Returns:
+        - True if the token is revoked.
+        """
+        if jti not in self.filter:
+            return False
+        result = await execute(db, revoked_statement(jti))
+        return result.scalar_one_or_none() is not None
+
+    async def revoke(self, jti: str, user_id: int, expires_at: datetime, db: Session):
+        """
+        Revoke a token ID. The caller commits the session.
+
+        - **jti**: The token ID.
+        - **user_id**: The ID of the user the token was issued to.
+        - **expires_at**: When the token expires, after which the revocation can be pruned.
+        - **db**: The database session on the primary (sync Session or AsyncSession).
+        """
+        await execute(db, insert(RevokedTokens).values(
+            jti = jti, user_id = user_id, expires_at = expires_at
+        ).on_conflict_do_nothing(index_elements = [RevokedTokens.jti]))
+        self.filter.add(jti)
+
+    def sync(self):
+        """
+        Add revocations recorded since the last sync (by any worker) to the filter. Blocking.
+        """
+        statement = select(RevokedTokens.jti, RevokedTokens.revoked_at)
+        if self.synced_until is not None:
+            statement = statement.where(RevokedTokens.revoked_at >= self.synced_until - SYNC_OVERLAP)
+        with engine.connect() as connection:
+            rows = connection.execute(statement).all()
+        for jti, revoked_at in rows:
+            if jti not in self.filter:
+                self.filter.add(jti)
+            if self.synced_until is None or revoked_at > self.synced_until:
+                self.synced_until = revoked_at
+
+    def rebuild(self):
+        """
+        Delete expired revocations and rebuild the filter from the remaining ones. Blocking.
+        """
+        with engine.begin() as connection:
+            connection.execute(delete(RevokedTokens).where(RevokedTokens.expires_at < func.now()))
+            rows = connection.execute(select(RevokedTokens.jti, RevokedTokens.revoked_at)).all()
+
+        bloom = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+        synced_until = None
+        for jti, revoked_at in rows:
+            bloom.add(jti)
+            if synced_until is None or revoked_at > synced_until:
+                synced_until = revoked_at
+        self.filter = bloom
+        self.synced_until = synced_until
+        # Pick up revocations committed while the filter was being rebuilt
+        self.sync()
+
+    async def run(self):
+        """
+        Background task keeping the filter in sync and pruning expired revocations until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        next_prune = loop.time() + settings.REVOCATION_PRUNE_SECONDS
+        while True:
+            await asyncio.sleep(settings.REVOCATION_SYNC_SECONDS)
+            try:
+                if loop.time() >= next_prune:
+                    next_prune = loop.time() + settings.REVOCATION_PRUNE_SECONDS
+                    await run_in_threadpool(self.rebuild)
+                else:
+                    await run_in_threadpool(self.sync)
+            except Exception as e:
+                print(f"Revocation list refresh failed: {e}")
+
+    def stats(self):
+        """
+        Report the size of the filter.
+
+        Returns:
+        - A dictionary with the number of revoked IDs in the filter, its memory footprint and its
+          estimated false-positive rate.
+        """
+        return {
+            "entries": len(self.filter),
+            "memory_bytes": self.filter.memory_bytes,
+            "false_positive_rate": self.filter.false_positive_rate(),
+        }
+
+
+def expiry_datetime(exp: int):
+    """
+    Convert an `exp` claim to an aware datetime.
+    """
+    return datetime.fromtimestamp(exp, tz = timezone.utc)
+
+
+# Shared revocation list used by the auth dependencies and the logout/revoke endpoints
+revocation_list = RevocationList(settings.REVOCATION_BLOOM_CAPACITY, settings.REVOCATION_BLOOM_ERROR_RATE)
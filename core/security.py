@@ -1,28 +1,37 @@
-import json
-from fastapi import Depends, HTTPException, status
+import time
+import uuid
+import hmac
+import hashlib
+from fastapi import Depends, HTTPException, Header, status
 from sqlalchemy.orm import Session
-from core.database import get_db
+from sqlalchemy import select
+from core.database import get_db, execute
 from core.config import settings
-from jose import JWTError, jwt
+from jose import JWTError
 from schemas.token_schema import TokenData
+from schemas.user_schema import CurrentUser
 from models.user_model import UserProfile
-from datetime import timedelta, datetime
-from passlib.context import CryptContext
+from core.hashing import hashing_executor
+from core.cache import TTLCache
+from core.tokens import access_token_keys, refresh_token_keys
+from core.revocation import revocation_list
 from fastapi.security.oauth2 import OAuth2PasswordBearer
 
-# Initialize CryptContext for password hashing and verification
-password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # OAuth2 scheme for token-based authentication
 auth_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-# Secret key and algorithm for creating JWT access tokens
-SECRET_KEY = settings.SECRET_KEY
-ALGORITHM = settings.TOKEN_CREATION_ALGORITHM
-
 # Expiry time of the access token in minutes
 TOKEN_EXPIRY_MINUTES = settings.TOKEN_EXPIRY_LIMIT
 
+# Expiry time of the refresh token in days
+REFRESH_TOKEN_EXPIRY_DAYS = settings.REFRESH_TOKEN_EXPIRY_DAYS
+
+# Cache of verified access tokens, keyed by the SHA-256 digest of the token and holding its TokenData
+token_cache = TTLCache(maxsize = settings.TOKEN_CACHE_SIZE)
+
+# Cache of user profiles resolved by the auth dependencies, keyed by user ID
+user_cache = TTLCache(maxsize = settings.USER_CACHE_SIZE, ttl = settings.USER_CACHE_TTL_SECONDS)
+
 async def create_access_token(data: dict):
     """
     Create a JWT access token.
@@ -34,12 +43,12 @@ async def create_access_token(data: dict):
     """
     data_encode = data.copy()
 
-    # Set the expiration time for the access token
-    expire = datetime.utcnow() + timedelta(minutes=TOKEN_EXPIRY_MINUTES)
-    data_encode.update({"expiry time": json.dumps(expire, default=str)})
+    # Set the standard expiry claim and a unique token ID, used to revoke the token
+    expire = int(time.time()) + TOKEN_EXPIRY_MINUTES * 60
+    data_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
 
-    # Encode the data into a JWT access token
-    access_token = jwt.encode(data_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # Sign the data with the active key of the access token key ring
+    access_token = access_token_keys.sign(data_encode)
     return access_token
 
 async def create_refresh_access_token(data: dict):
@@ -53,31 +62,71 @@ async def create_refresh_access_token(data: dict):
     """
     data_encode = data.copy()
 
+    # Set the expiry and a unique token ID, so every login issues a different token and a logged-out
+    # one never becomes valid again
+    expire = int(time.time()) + REFRESH_TOKEN_EXPIRY_DAYS * 24 * 60 * 60
+    data_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
+
     # Encode the data into a JWT refresh token
-    refresh_access_token = jwt.encode(data_encode, settings.REFRESH_TOKEN_SECRET, algorithm=ALGORITHM)
+    refresh_access_token = refresh_token_keys.sign(data_encode)
     return refresh_access_token
 
+def token_digest(token: str):
+    """
+    Return the SHA-256 digest of a token, used to store and look up tokens without keeping them.
+
+    - **token**: The encoded JWT.
+
+    Returns:
+    - The 32-byte digest.
+    """
+    return hashlib.sha256(token.encode()).digest()
+
+def decode_access_token(token: str, verify_exp: bool = True):
+    """
+    Verify the signature of an access token and decode its claims.
+
+    - **token**: JWT access token to decode.
+    - **verify_exp**: Whether an expired token is rejected.
+
+    Returns:
+    - The TokenData of the token.
+
+    Raises:
+    - JWTError if the token is invalid, expired (when checked) or lacks the `id`, `exp` or `jti` claims.
+    """
+    data_decode = access_token_keys.verify(token, options={"verify_exp": verify_exp, "require_exp": True, "require_jti": True})
+    if not data_decode.get("id"):
+        raise JWTError("Missing user ID")
+    return TokenData(id=data_decode["id"], jti=data_decode["jti"], exp=data_decode["exp"])
+
 def verify_access_token(token: str, credentials_exception):
     """
     Verify and decode an access token.
 
+    Verified tokens are cached until they expire, so repeated requests with the same bearer token
+    skip signature verification. Revocation is checked separately by `get_current_token`.
+
     - **token**: JWT access token to verify.
     - **credentials_exception**: Exception to raise if the token is invalid.
 
     Returns:
-    - The user ID extracted from the token.
+    - The TokenData of the token.
     """
-    try:
-        # Decode the access token
-        data_decode = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        id: int = data_decode.get("id")
+    digest = token_digest(token)
+    token_data = token_cache.get(digest)
+    if token_data is not None:
+        return token_data
 
-        if not id:
-            raise credentials_exception
-        token_data = TokenData(id=id)
+    try:
+        token_data = decode_access_token(token)
     except JWTError:
         raise credentials_exception
-    return token_data.id
+
+    ttl = token_data.exp - time.time()
+    if ttl > 0:
+        token_cache.set(digest, token_data, ttl = ttl)
+    return token_data
 
 async def verify_refresh_access_token(token: str, credentials_exception):
     """
@@ -88,10 +137,12 @@ async def verify_refresh_access_token(token: str, credentials_exception):
 
     Returns:
     - The user ID extracted from the token.
+
+    Tokens without the `exp` and `jti` claims, issued before refresh tokens carried them, are rejected.
     """
     try:
         # Decode the refresh token
-        data_decode = jwt.decode(token, settings.REFRESH_TOKEN_SECRET, algorithms=[ALGORITHM])
+        data_decode = refresh_token_keys.verify(token, options={"require_exp": True, "require_jti": True})
         id: int = data_decode.get("id")
 
         if not id:
@@ -110,7 +161,7 @@ async def get_hash_password(password: str):
     Returns:
     - The hashed password.
     """
-    return password_context.hash(password)
+    return await hashing_executor.hash(password)
 
 async def verify_password(plain_pwd, hash_pwd):
     """
@@ -122,36 +173,109 @@ async def verify_password(plain_pwd, hash_pwd):
     Returns:
     - True if the password matches, False otherwise.
     """
-    return password_context.verify(plain_pwd, hash_pwd)
+    return await hashing_executor.verify(plain_pwd, hash_pwd)
 
-def get_current_user(token: str = Depends(auth_scheme), db: Session = Depends(get_db)):
+async def verify_and_update_password(plain_pwd, hash_pwd):
     """
-    Get the currently authenticated user based on the access token.
+    Verify a plaintext password and produce a replacement hash if the stored one is outdated.
+
+    - **plain_pwd**: The plaintext password.
+    - **hash_pwd**: The hashed password to compare against.
+
+    Returns:
+    - A tuple of whether the password matches and the new hash, or None if no rehash is needed.
+    """
+    return await hashing_executor.verify_and_update(plain_pwd, hash_pwd)
+
+def profile_statement(user_id: int):
+    """
+    Select the profile columns and version of a user by ID, never including the password hash.
+    """
+    return select(
+        UserProfile.user_id, UserProfile.name, UserProfile.email, UserProfile.location, UserProfile.about,
+        UserProfile.version
+    ).where(UserProfile.user_id == user_id)
+
+async def load_user(user_id: int, db: Session):
+    """
+    Resolve a user profile by ID, serving it from the user cache when possible.
+
+    - **user_id**: The ID of the user to load.
+    - **db**: The database session, only used on a cache miss.
+
+    Returns:
+    - A CurrentUser snapshot, or None if no such user exists.
+    """
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    result = await execute(db, profile_statement(user_id))
+    row = result.mappings().one_or_none()
+    if row is None:
+        return None
+
+    user = CurrentUser(**row)
+    user_cache.set(user_id, user)
+    return user
+
+def invalidate_user(user_id: int):
+    """
+    Drop a user from the user cache. Must be called by every write path that changes a user profile.
+
+    - **user_id**: The ID of the user whose profile changed.
+    """
+    user_cache.pop(user_id)
+
+def require_admin(x_admin_token: str = Header(None)):
+    """
+    Dependency guarding admin-only endpoints with the shared ADMIN_TOKEN setting.
+
+    - **x_admin_token**: Value of the `X-Admin-Token` request header.
+
+    Raises:
+    - HTTPException 403 if admin endpoints are disabled (no ADMIN_TOKEN configured) or the header does not match.
+    """
+    # compare_digest only takes ASCII strings, so compare the raw header bytes (decoded as latin-1 by Starlette)
+    if not settings.ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(
+        x_admin_token.encode("latin-1"), settings.ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+async def get_current_token(token: str = Depends(auth_scheme), db: Session = Depends(get_db)):
+    """
+    Verify the bearer access token of the request and make sure it has not been revoked.
+
+    A token revoked by this worker is rejected at once. A token revoked by another worker is only in this
+    worker's revocation filter after its next sync, so it is still accepted here for up to
+    REVOCATION_SYNC_SECONDS (longer while syncs fail).
 
     - **token**: The JWT access token provided in the request.
-    - **db**: The database session dependency.
+    - **db**: The database session dependency on the primary, only queried when the revocation filter
+      reports a possible match, so replica lag adds nothing to that window.
 
     Returns:
-    - The UserProfile object for the currently authenticated user.
+    - The TokenData of the access token.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid Credentials",
         headers={"WWW-Authenticate": "Bearer"}
     )
-    token = verify_access_token(token, credentials_exception)
-    user = db.query(UserProfile).filter(UserProfile.user_id == token).one_or_none()
-    return user
+    token_data = verify_access_token(token, credentials_exception)
+    if await revocation_list.is_revoked(token_data.jti, db):
+        raise credentials_exception
+    return token_data
 
 async def get_current_user_from_refresh_token(token: str = Depends(auth_scheme), db: Session = Depends(get_db)):
     """
     Get the currently authenticated user based on the refresh token.
 
     - **token**: The JWT refresh token provided in the request.
-    - **db**: The database session dependency.
+    - **db**: The database session dependency (sync Session or AsyncSession).
 
     Returns:
-    - The UserProfile object for the currently authenticated user.
+    - The CurrentUser snapshot for the currently authenticated user, or None if the user does not exist.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -159,5 +283,4 @@ async def get_current_user_from_refresh_token(token: str = Depends(auth_scheme),
         headers={"WWW-Authenticate": "Bearer"}
     )
     token = await verify_refresh_access_token(token, credentials_exception)
-    user = db.query(UserProfile).filter(UserProfile.user_id == token).one_or_none()
-    return user
+    return await load_user(token, db)
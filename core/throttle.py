@@ -0,0 +1,128 @@
+import math
+import time
+from collections import OrderedDict
+from fastapi import Request
+from core.config import settings
+from schemas.user_schema import Login
+
+
+class LoginThrottled(Exception):
+    """
+    Raised by login_admission when the email or the client IP is over its login limit.
+
+    - **retry_after**: Seconds until another attempt would be admitted.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__("Too many login attempts.")
+        self.retry_after = retry_after
+
+
+class SlidingWindowLimiter:
+    """
+    Approximate sliding-window rate limiter with a bounded number of tracked keys.
+
+    Each key keeps only the counts of the current and the previous fixed window; the previous count
+    is weighted by how much of it still overlaps the sliding window. Keys are kept in LRU order and the
+    least recently seen key is dropped once `max_keys` is reached, so an attack spread over many keys
+    cannot grow memory without bound.
+
+    - **limit**: Requests allowed per key within the window.
+    - **window**: Window length in seconds.
+    - **max_keys**: Maximum number of keys tracked at once.
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._keys = OrderedDict()
+
+    def _state(self, key, now: float):
+        index = int(now // self.window)
+        state = self._keys.get(key)
+        if state is None:
+            return [index, 0, 0]
+        if state[0] != index:
+            # Roll the windows forward; anything older than the previous window no longer counts
+            state[2] = state[1] if state[0] == index - 1 else 0
+            state[1] = 0
+            state[0] = index
+        return state
+
+    def retry_after(self, key, now: float = None):
+        """
+        Return 0 if a request for the key is allowed now, otherwise the seconds until it would be.
+        """
+        now = time.monotonic() if now is None else now
+        _, current, previous = self._state(key, now)
+        elapsed = now % self.window
+        estimated = previous * (1 - elapsed / self.window) + current
+        if estimated < self.limit:
+            return 0
+        if current < self.limit:
+            # Wait until the previous window's weight has decayed enough to admit one more request
+            wait = self.window * (1 - (self.limit - current) / previous) - elapsed
+        else:
+            # Nothing is admitted before this window ends; then the current count becomes the previous one
+            # and has to decay below the limit: current * (1 - t / window) < limit
+            wait = self.window - elapsed + self.window * (1 - self.limit / current)
+        # The estimate has to drop strictly below the limit, so round up past an exact boundary
+        return math.floor(wait) + 1
+
+    def hit(self, key, now: float = None):
+        """
+        Record a request for the key.
+        """
+        now = time.monotonic() if now is None else now
+        state = self._state(key, now)
+        state[1] += 1
+        self._keys[key] = state
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.max_keys:
+            self._keys.popitem(last = False)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+# Login attempt limiters, one keyed by email and one by client IP
+email_limiter = SlidingWindowLimiter(
+    settings.LOGIN_ATTEMPTS_PER_EMAIL, settings.LOGIN_RATE_WINDOW_SECONDS, settings.LOGIN_RATE_MAX_KEYS
+)
+ip_limiter = SlidingWindowLimiter(
+    settings.LOGIN_ATTEMPTS_PER_IP, settings.LOGIN_RATE_WINDOW_SECONDS, settings.LOGIN_RATE_MAX_KEYS
+)
+
+
+def client_ip(request: Request):
+    """
+    Return the client IP, honoring X-Forwarded-For only when LOGIN_TRUST_FORWARDED_FOR is enabled.
+    """
+    if settings.LOGIN_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def login_admission(request: Request, loginInfo: Login):
+    """
+    Dependency admitting or rejecting a login attempt before any database query or password hash.
+
+    - **request**: The incoming request, used for the client IP.
+    - **loginInfo**: The login credentials, used for the email.
+
+    Raises:
+    - LoginThrottled if the email or the client IP is over its limit; it is answered with a 429 and a `Retry-After` header.
+    """
+    if not settings.LOGIN_RATE_LIMIT_ENABLED:
+        return
+
+    email = loginInfo.email.lower()
+    ip = client_ip(request)
+    retry_after = max(email_limiter.retry_after(email), ip_limiter.retry_after(ip))
+    if retry_after:
+        raise LoginThrottled(retry_after)
+    email_limiter.hit(email)
+    ip_limiter.hit(ip)
@@ -0,0 +1,137 @@
+from jose import jwk, jwt, JWTError
+from jose.constants import ALGORITHMS
+from core.config import settings
+
+
+class TokenKey:
+    """
+    A JWT key constructed once and reused for every sign and verify call.
+
+    Attributes:
+    - **kid**: The key ID written to the token header, or None for tokens without one.
+    - **algorithm**: The JWS algorithm the key is pinned to; tokens claiming another one are rejected.
+    - **key**: The jose key object used for signing.
+    - **verifier**: The key object used for verification (the public key for asymmetric algorithms).
+    - **can_sign**: Whether the key holds private (or shared secret) material.
+    """
+
+    def __init__(self, kid, algorithm: str, material):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.key = jwk.construct(material, algorithm)
+        if algorithm in ALGORITHMS.HMAC:
+            self.verifier = self.key
+            self.can_sign = True
+        else:
+            self.verifier = self.key.public_key()
+            self.can_sign = not self.key.is_public()
+
+    @property
+    def is_public(self):
+        return self.algorithm not in ALGORITHMS.HMAC
+
+    def to_jwk(self):
+        """
+        Return the public JWK of the key. Shared HMAC secrets are never exported.
+        """
+        if not self.is_public:
+            raise ValueError("HMAC keys cannot be published")
+        return dict(self.verifier.to_dict(), kid = self.kid, use = "sig")
+
+
+class KeyRing:
+    """
+    JWT keys indexed by `kid`, one of which signs new tokens.
+
+    Tokens are verified with the key named by their `kid` header and only with that key's algorithm,
+    so keys can be rotated by adding the new one, making it active and removing the old one once the
+    tokens it signed have expired.
+
+    - **keys**: The TokenKey objects of the ring.
+    - **active_kid**: The kid of the key signing new tokens. None selects the key without a kid, if
+      any; a ring without a signing key is verify-only.
+    """
+
+    def __init__(self, keys, active_kid=None):
+        self.keys = { key.kid: key for key in keys }
+        self.active = self.keys.get(active_kid)
+        if active_kid is not None and (self.active is None or not self.active.can_sign):
+            raise ValueError(f"No private signing key with kid {active_kid!r}")
+
+    @classmethod
+    def from_jwks(cls, document: dict):
+        """
+        Build a verify-only ring from a JWKS document, e.g. the one served at `/.well-known/jwks.json`.
+        """
+        return cls([TokenKey(key["kid"], key["alg"], key) for key in document["keys"]])
+
+    def sign(self, claims: dict):
+        """
+        Sign claims with the active key.
+
+        Returns:
+        - The encoded JWT, carrying the active key's `kid` in its header.
+        """
+        if self.active is None:
+            raise ValueError("This key ring has no signing key")
+        headers = { "kid": self.active.kid } if self.active.kid is not None else None
+        return jwt.encode(claims, self.active.key, algorithm = self.active.algorithm, headers = headers)
+
+    def verify(self, token: str, options: dict = None):
+        """
+        Verify a JWT against the key named by its `kid` header.
+
+        - **token**: The encoded JWT.
+        - **options**: Claim validation options passed to `jose.jwt.decode`.
+
+        Returns:
+        - The decoded claims.
+
+        Raises:
+        - JWTError if the token is malformed, names an unknown key or has an invalid signature.
+        """
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self.keys.get(kid)
+        if key is None:
+            raise JWTError("Unknown signing key")
+        return jwt.decode(token, key.verifier, algorithms = [key.algorithm], options = options)
+
+    def jwks(self):
+        """
+        Return the JWKS document of the ring's public keys.
+        """
+        return { "keys": [key.to_jwk() for key in self.keys.values() if key.is_public] }
+
+
+def _hmac_algorithm(algorithm: str):
+    # Secret-keyed tokens keep the configured algorithm when it is HMAC, HS256 otherwise
+    return algorithm if algorithm in ALGORITHMS.HMAC else ALGORITHMS.HS256
+
+
+def load_access_key_ring():
+    """
+    Build the access token key ring from settings.
+
+    TOKEN_KEYS maps each kid to a secret (HMAC algorithms) or to the path of a PEM private or public
+    key (ES256/RS256); TOKEN_ACTIVE_KID selects the one signing new tokens. Tokens without a `kid`
+    are verified with SECRET_KEY, which also signs new tokens while no active kid is configured.
+    """
+    algorithm = settings.TOKEN_CREATION_ALGORITHM
+    keys = [TokenKey(None, _hmac_algorithm(algorithm), settings.SECRET_KEY)]
+    for kid, value in settings.TOKEN_KEYS.items():
+        if algorithm in ALGORITHMS.HMAC:
+            keys.append(TokenKey(kid, algorithm, value))
+        else:
+            with open(value) as file:
+                keys.append(TokenKey(kid, algorithm, file.read()))
+
+    if settings.TOKEN_ACTIVE_KID is None and algorithm not in ALGORITHMS.HMAC:
+        raise ValueError(f"TOKEN_ACTIVE_KID must name a private key in TOKEN_KEYS to sign {algorithm} tokens")
+    return KeyRing(keys, active_kid = settings.TOKEN_ACTIVE_KID)
+
+
+# Key rings used by core.security; refresh tokens are only ever verified by this service
+access_token_keys = load_access_key_ring()
+refresh_token_keys = KeyRing([
+    TokenKey(None, _hmac_algorithm(settings.TOKEN_CREATION_ALGORITHM), settings.REFRESH_TOKEN_SECRET)
+])
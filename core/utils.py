@@ -1,29 +1,125 @@
-from fastapi.responses import JSONResponse
+import orjson
+from pydantic import BaseModel
+from sqlalchemy.engine import Row, RowMapping
+from fastapi.responses import JSONResponse, Response
 
 
-async def responses(message: str = None, status_code: int = None, error=None, data=None):
+def _default(value):
+    """
+    Serialize the values orjson does not handle natively.
+
+    - Pydantic models are dumped straight to JSON by pydantic-core and embedded as a fragment,
+      so no intermediate dict is built.
+    - SQLAlchemy result rows are serialized as mappings of their selected columns. ORM entities are
+      deliberately not supported, so a model with a password column can never be dumped by accident.
+    """
+    if isinstance(value, BaseModel):
+        return orjson.Fragment(value.model_dump_json())
+    if isinstance(value, Row):
+        return value._asdict()
+    if isinstance(value, RowMapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, serializing Pydantic models and result rows directly.
+
+    Used as the application's default response class.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default = _default, option = orjson.OPT_NON_STR_KEYS)
+
+
+class StaticError:
+    """
+    An error response whose body is encoded once, at import time, and reused for every request.
+
+    - **status_code**: HTTP status code of the response.
+    - **error**: Error detail, rendered like `responses(error=...)`.
+    - **headers**: Optional headers sent with the response, e.g. `Retry-After`.
+    """
+
+    def __init__(self, status_code: int, error, headers: dict = None):
+        self.status_code = status_code
+        self.body = orjson.dumps({ "error": error })
+        self.headers = headers
+
+    def response(self):
+        """
+        Build a response carrying the pre-encoded body.
+        """
+        return Response(
+            content = self.body, status_code = self.status_code, media_type = "application/json", headers = self.headers
+        )
+
+
+def etag_matches(if_none_match: str, etag: str):
+    """
+    Check an `If-None-Match` header against an entity tag, using the weak comparison of RFC 9110.
+
+    - **if_none_match**: The header value, a comma-separated list of entity tags or `*`.
+    - **etag**: The current entity tag of the resource.
+
+    Returns:
+    - True if the client's copy is current and a 304 can be sent.
+    """
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate == "*" or candidate.removeprefix("W/") == opaque
+        for candidate in (part.strip() for part in if_none_match.split(","))
+    )
+
+
+def like_pattern(term: str, prefix: bool = False):
+    """
+    Build a LIKE/ILIKE pattern matching a literal search term, escaping `%`, `_` and the `\\` escape character.
+
+    - **term**: The text to search for.
+    - **prefix**: Match values starting with the term instead of values containing it.
+
+    Returns:
+    - The pattern, to be used with `escape="\\"`.
+    """
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%" if prefix else f"%{escaped}%"
+
+
+async def responses(message: str = None, status_code: int = None, error=None, data=None, headers: dict = None):
     """
     Create a JSON response with a custom message, error, and data.
 
     - **message**: Optional message to include in the response.
     - **status_code**: HTTP status code for the response.
-    - **error**: Optional error detail to include in the response.
-    - **data**: Optional data to include in the response.
+    - **error**: Optional error detail to include in the response, or a pre-encoded StaticError.
+    - **data**: Optional data to include in the response; Pydantic models and result rows are
+      serialized directly.
+    - **headers**: Optional headers to include in the response.
 
     Returns:
-    - A JSONResponse object with the specified content and status code.
+    - A FastJSONResponse object with the specified content and status code.
     """
+    if isinstance(error, StaticError):
+        # Pre-encoded error bodies skip serialization entirely
+        return error.response()
+
     if message and not data:
         # If a message is provided and no data, return a response with the message
-        return JSONResponse(status_code = status_code, content = { "message": message })
+        return FastJSONResponse(status_code = status_code, content = { "message": message }, headers = headers)
 
     if error:
         # If an error is provided, return a response with the error
-        return JSONResponse(status_code = status_code, content = { "error": error })
+        return FastJSONResponse(status_code = status_code, content = { "error": error }, headers = headers)
 
     if message and data:
         # If both a message and data are provided, return a response with both
-        return JSONResponse(status_code = status_code, content = { "message": message, "data": data })
+        return FastJSONResponse(
+            status_code = status_code, content = { "message": message, "data": data }, headers = headers
+        )
 
     # Default case: return a response with no content if no message, error, or data are provided
-    return JSONResponse(status_code = 200)
+    return FastJSONResponse(status_code = 200, headers = headers)
@@ -0,0 +1,108 @@
+import time
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from core.database import engine, replica_engines, async_engine, async_replica_engines, execute
+from core.hashing import hashing_executor
+from core.revocation import revoked_statement
+from core.security import (
+    create_access_token, decode_access_token, create_refresh_access_token, verify_refresh_access_token,
+    profile_statement
+)
+from crud.user_crud import login_statement, refresh_token_statement
+
+
+def _request_engines():
+    # The engines serving API requests: the async ones in DB_ASYNC mode, otherwise the sync ones
+    if settings.DB_ASYNC:
+        return [async_engine, *async_replica_engines]
+    return [engine, *replica_engines]
+
+
+def _hot_statements():
+    # The statements behind login, token refresh and every authenticated request, with values
+    # that match no row
+    return [
+        login_statement("warm-up@example.invalid"),
+        profile_statement(0),
+        refresh_token_statement(bytes(32)),
+        revoked_statement(""),
+    ]
+
+
+def _open_sync_connections(sync_engine, count: int):
+    connections = [sync_engine.connect() for _ in range(min(count, sync_engine.pool.size()))]
+    for connection in connections:
+        connection.close()
+    return len(connections)
+
+
+async def open_connections(count: int):
+    """
+    Open up to `count` pooled connections on every engine, so they are ready before the first request.
+
+    Connections are checked out at the same time and then returned, which leaves them idle in the pool.
+
+    Returns:
+    - The number of connections opened.
+    """
+    # The sync engine also serves schema bootstrap, imports and maintenance work in DB_ASYNC mode
+    opened = await run_in_threadpool(_open_sync_connections, engine, count)
+    for request_engine in _request_engines():
+        if request_engine is engine:
+            continue
+        if not settings.DB_ASYNC:
+            opened += await run_in_threadpool(_open_sync_connections, request_engine, count)
+            continue
+        connections = [
+            await request_engine.connect() for _ in range(min(count, request_engine.sync_engine.pool.size()))
+        ]
+        for connection in connections:
+            await connection.close()
+        opened += len(connections)
+    return opened
+
+
+async def compile_queries():
+    """
+    Execute the hot queries once on every request engine, filling each engine's compiled statement cache.
+    """
+    for request_engine in _request_engines():
+        if settings.DB_ASYNC:
+            async with AsyncSession(request_engine) as db:
+                for statement in _hot_statements():
+                    await execute(db, statement)
+        else:
+            with Session(bind = request_engine) as db:
+                for statement in _hot_statements():
+                    await execute(db, statement)
+
+
+async def warm_tokens():
+    """
+    Sign and verify an access and a refresh token, setting up the JWT code paths.
+    """
+    decode_access_token(await create_access_token(data = { "id": 1 }))
+    await verify_refresh_access_token(await create_refresh_access_token(data = { "id": 1 }), ValueError)
+
+
+async def warm_up():
+    """
+    Run every warm-up step, so the first requests after startup do not pay one-time setup costs.
+
+    Returns:
+    - The time each step took, in milliseconds.
+    """
+    report = {}
+    for name, step in (
+        ("connections", lambda: open_connections(settings.WARMUP_CONNECTIONS)),
+        ("tokens", warm_tokens),
+        # Starts the hashing workers and loads the bcrypt backend
+        ("hashing", lambda: hashing_executor.hash("warm-up-password")),
+        ("queries", compile_queries),
+    ):
+        start = time.perf_counter()
+        await step()
+        report[f"{name}_ms"] = (time.perf_counter() - start) * 1000
+    return report
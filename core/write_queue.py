@@ -0,0 +1,195 @@
+import time
+import asyncio
+from fastapi.concurrency import run_in_threadpool
+from core.config import settings
+from core.database import engine, execute, commit
+from core.metrics import write_queue_batch_rows, write_queue_flush_duration
+
+DURABILITY_MODES = ("inline", "sync", "async")
+
+
+class WriteQueue:
+    """
+    Group-commit writer for small, idempotent auth-side writes (refresh token digests, password rehashes).
+
+    Writes are queued and flushed by a background task every `flush_ms` milliseconds or once
+    `max_batch` writes are pending, whichever comes first. Each flush merges the writes of a kind
+    into one multi-row statement (the last write per key wins) and commits them all at once.
+
+    Durability modes:
+    - **inline**: No queue; writes run and commit in the request's own session.
+    - **sync**: The request waits until the flush containing its writes has committed.
+    - **async**: Opt-in. The request returns as soon as its writes are queued; writes still queued when
+      the process dies are lost, so only writes that are redone on the next request may use the queue.
+
+    Attributes:
+    - **durability**: One of the modes above.
+    - **flush_ms**: Longest time a write waits for its flush.
+    - **max_batch**: Writes that trigger a flush before `flush_ms` has passed.
+    - **max_pending**: Bound on queued writes; callers wait for room once it is reached.
+    """
+
+    def __init__(self, durability: str = "sync", flush_ms: int = 20, max_batch: int = 500, max_pending: int = 10000):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown write queue durability mode: {durability}")
+        self.durability = durability
+        self.flush_ms = flush_ms
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._builders = {}
+        self._pending = {}
+        self._queue = None
+        self._task = None
+        self._flushing = asyncio.Lock()
+
+    def register(self, kind: str, build_statement):
+        """
+        Register a kind of write.
+
+        - **kind**: Name of the write kind.
+        - **build_statement**: Callable turning a list of value dictionaries into one statement, or a list of
+          statements run in order.
+        """
+        self._builders[kind] = build_statement
+        return build_statement
+
+    def _statements(self, kind: str, rows):
+        statements = self._builders[kind](rows)
+        return statements if isinstance(statements, list) else [statements]
+
+    def start(self):
+        """
+        Start the background flush task. Without it, writes run inline.
+        """
+        if self.durability != "inline" and self._task is None:
+            self._queue = asyncio.Queue(maxsize = self.max_pending)
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """
+        Flush every queued write and stop the background task.
+        """
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+
+    def pending(self, kind: str, key):
+        """
+        Return the values of a queued, not yet committed write, or None.
+        """
+        return self._pending.get((kind, key))
+
+    async def discard(self, kind: str, key):
+        """
+        Drop a queued, not yet committed write, so a later write (such as a delete) is not undone by its flush.
+        Waits for a flush already in progress, which may have picked the write up before it was dropped.
+        """
+        self._pending.pop((kind, key), None)
+        async with self._flushing:
+            pass
+
+    def depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, writes, db):
+        """
+        Submit writes according to the durability mode.
+
+        - **writes**: List of (kind, key, values) tuples; `key` identifies the row a write replaces.
+        - **db**: The request's session, used when writing inline (sync Session or AsyncSession).
+        """
+        if not writes:
+            return
+        if self._task is None:
+            for kind, _, values in writes:
+                for statement in self._statements(kind, [values]):
+                    await execute(db, statement)
+            await commit(db)
+            return
+
+        done = asyncio.get_running_loop().create_future() if self.durability == "sync" else None
+        for kind, key, values in writes:
+            self._pending[(kind, key)] = values
+            await self._queue.put((kind, key, values, done))
+        if done is not None:
+            await done
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_ms / 1000
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+        # Shutting down: flush whatever is still queued
+        batch = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                batch.append(item)
+        if batch:
+            await self._flush(batch)
+
+    def _write(self, statements):
+        with engine.begin() as connection:
+            for statement in statements:
+                connection.execute(statement)
+
+    async def _flush(self, batch):
+        async with self._flushing:
+            await self._flush_batch(batch)
+
+    async def _flush_batch(self, batch):
+        # Merge writes per kind, keeping the last one per key and skipping discarded ones
+        merged = {}
+        for kind, key, values, _ in batch:
+            if self._pending.get((kind, key)) is values:
+                merged.setdefault(kind, {})[key] = values
+        statements = [
+            statement for kind, rows in merged.items() for statement in self._statements(kind, list(rows.values()))
+        ]
+
+        start = time.perf_counter()
+        error = None
+        try:
+            await run_in_threadpool(self._write, statements)
+        except Exception as e:
+            error = e
+            print(f"Write queue flush of {len(batch)} writes failed: {e}")
+        write_queue_flush_duration.observe(time.perf_counter() - start)
+        write_queue_batch_rows.observe(len(batch))
+
+        for kind, key, values, done in batch:
+            if self._pending.get((kind, key)) is values:
+                del self._pending[(kind, key)]
+            if done is not None and not done.done():
+                if error is None:
+                    done.set_result(None)
+                else:
+                    done.set_exception(error)
+
+
+# Shared write queue, started and flushed by the application's startup and shutdown hooks
+write_queue = WriteQueue(
+    durability = settings.WRITE_QUEUE_DURABILITY,
+    flush_ms = settings.WRITE_QUEUE_FLUSH_MS,
+    max_batch = settings.WRITE_QUEUE_MAX_BATCH,
+    max_pending = settings.WRITE_QUEUE_MAX_PENDING,
+)
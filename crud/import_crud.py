@@ -0,0 +1,350 @@
+import io
+import csv
+import asyncio
+import orjson
+import psycopg2
+from collections import deque
+from pydantic import ValidationError
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import SQLAlchemyError
+from core.config import settings
+from core.database import engine
+from core.hashing import hashing_executor
+from core.email_filter import email_filter
+from schemas import user_schema
+
+# Alias for easier reference
+schema_user = user_schema.UserProfile
+
+# Session-local staging table the batches are copied into before being merged into users
+CREATE_STAGING_TABLE = """
+    CREATE TEMP TABLE IF NOT EXISTS users_import (
+        line integer, name varchar, email varchar, location varchar, about text, password varchar
+    ) ON COMMIT DELETE ROWS
+"""
+COPY_STAGING_TABLE = "COPY users_import (line, name, email, location, about, password) FROM STDIN WITH (FORMAT csv)"
+MERGE_STAGING_TABLE = """
+    INSERT INTO users (name, email, location, about, password)
+    SELECT name, email, location, about, password FROM users_import ORDER BY line
+    ON CONFLICT (email) DO NOTHING
+    RETURNING email
+"""
+
+# Hashes bulk imports may run at once, shared by all imports; the remaining hashing workers stay free for logins
+_hash_slots = asyncio.Semaphore(settings.BULK_IMPORT_HASH_CONCURRENCY or max(hashing_executor.workers // 2, 1))
+
+
+def _decode(line, max_bytes: int):
+    # A line's text, or the ValueError it is reported with
+    if len(line) > max_bytes:
+        return ValueError(f"Row is longer than {max_bytes} bytes.")
+    try:
+        return line.decode("utf-8")
+    except UnicodeDecodeError as e:
+        return ValueError(f"Invalid UTF-8 at byte {e.start}.")
+
+
+async def _split_lines(chunks, max_bytes: int):
+    # Decoded lines with their line endings; splitting on b"\n" never cuts a UTF-8 sequence. Lines that
+    # are not valid UTF-8 or longer than max_bytes come out as a ValueError, and an overlong line is
+    # dropped as soon as it outgrows the limit instead of being buffered to its end.
+    buffer = bytearray()
+    number = 0
+    oversized = False
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b"\n", start)) >= 0:
+            number += 1
+            if oversized:
+                # The end of a line already reported as too long
+                oversized = False
+            else:
+                yield number, _decode(buffer[start:end + 1], max_bytes)
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > max_bytes:
+            if not oversized:
+                yield number + 1, ValueError(f"Row is longer than {max_bytes} bytes.")
+                oversized = True
+            buffer.clear()
+    if buffer and not oversized:
+        yield number + 1, _decode(buffer, max_bytes)
+
+
+async def iter_lines(chunks, max_bytes: int = settings.BULK_IMPORT_MAX_ROW_BYTES):
+    """
+    Split an async stream of byte chunks into decoded lines, without buffering the whole body.
+
+    - **chunks**: Async iterable of bytes, e.g. `request.stream()`.
+    - **max_bytes**: Longest line accepted.
+
+    Yields:
+    - Tuples of (line number, line text) for every non-blank line, or (line number, ValueError) for a
+      line that is not valid UTF-8 or longer than `max_bytes`.
+    """
+    async for number, line in _split_lines(chunks, max_bytes):
+        if isinstance(line, ValueError):
+            yield number, line
+        elif line.strip():
+            yield number, line.rstrip("\r\n")
+
+
+class _LineFeed:
+    """
+    Iterator over buffered (line number, line text) pairs that a csv.reader pulls from. Unlike a
+    generator it can be refilled after running dry, so one reader can parse the whole stream.
+    """
+
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()[1]
+
+
+async def iter_csv_records(chunks, max_bytes: int = settings.BULK_IMPORT_MAX_ROW_BYTES):
+    """
+    Parse an async stream of byte chunks as CSV with a single csv.reader, without buffering the whole body.
+
+    Lines are handed to the reader once their quotes balance, so quoted fields may span lines. A
+    record whose quote is still open at the end of the stream or at an unreadable line is reported as
+    malformed; one that outgrows `max_bytes` is reported as too long and skipped up to its closing quote.
+
+    - **chunks**: Async iterable of bytes, e.g. `request.stream()`.
+    - **max_bytes**: Longest line or record accepted.
+
+    Yields:
+    - Tuples of (first line number, record), where the record is the list of fields, the csv.Error of
+      a record with an unterminated quote or the ValueError of a line that is not valid UTF-8 or of a
+      record longer than `max_bytes`.
+    """
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    quotes = 0
+    size = 0
+    skipping = False
+
+    def records():
+        while feed.lines:
+            number = feed.lines[0][0]
+            try:
+                yield number, next(reader)
+            except csv.Error as e:
+                yield number, e
+            except StopIteration:
+                return
+
+    def unterminated():
+        # The buffered lines open a quoted field that never closes
+        number = feed.lines[0][0]
+        feed.lines.clear()
+        return number, csv.Error("Unterminated quoted field.")
+
+    async for number, line in _split_lines(chunks, max_bytes):
+        if isinstance(line, ValueError):
+            # An unreadable line ends the record in progress
+            if feed.lines:
+                yield unterminated()
+            quotes = 0
+            size = 0
+            skipping = False
+            yield number, line
+            continue
+        if skipping:
+            # The rest of a record already reported as too long, up to its closing quote
+            quotes += line.count('"')
+            if quotes % 2 == 0:
+                quotes = 0
+                skipping = False
+            continue
+        # Blank lines between records are skipped; inside a quoted field they are part of the value
+        if not feed.lines and not line.strip():
+            continue
+        feed.lines.append((number, line))
+        quotes += line.count('"')
+        size += len(line)
+        if quotes % 2 == 0:
+            for record in records():
+                yield record
+            quotes = 0
+            size = 0
+        elif size > max_bytes:
+            yield feed.lines[0][0], ValueError(f"Row is longer than {max_bytes} bytes.")
+            feed.lines.clear()
+            size = 0
+            skipping = True
+    if feed.lines:
+        yield unterminated()
+
+
+class UserImport:
+    """
+    Streams user rows from an NDJSON or CSV body into the users table.
+
+    Rows are validated with the UserProfile schema, hashed across the password hashing pool and loaded
+    in batches with Postgres COPY through a staging table, so existing emails are reported per row
+    instead of failing the whole batch. A batch the database rejects is reported row by row and the
+    import carries on with the next one. CSV input must start with a header row naming the columns;
+    quoted fields may span lines.
+
+    - **fmt**: Either "ndjson" or "csv".
+    - **batch_size**: Number of rows per batch.
+    """
+
+    def __init__(self, fmt: str = "ndjson", batch_size: int = settings.BULK_IMPORT_BATCH_SIZE):
+        if fmt not in ("ndjson", "csv"):
+            raise ValueError(f"Unsupported import format: {fmt}")
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.received = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self._header = None
+        self._connection = None
+
+    def _error(self, line: int, error, email: str = None):
+        self.failed += 1
+        if len(self.errors) < settings.BULK_IMPORT_MAX_ERRORS:
+            self.errors.append({ "line": line, "email": email, "error": error })
+
+    def _records(self, chunks):
+        if self.fmt == "ndjson":
+            return iter_lines(chunks)
+        return iter_csv_records(chunks)
+
+    def _parse(self, record):
+        if isinstance(record, (csv.Error, ValueError)):
+            raise record
+        if self.fmt == "ndjson":
+            return orjson.loads(record)
+        values = record
+        if self._header is None:
+            self._header = [value.strip() for value in values]
+            return None
+        return dict(zip(self._header, values))
+
+    async def _hash(self, password: str):
+        async with _hash_slots:
+            return await hashing_executor.hash(password, wait = True)
+
+    async def _hash_batch(self, batch):
+        # Hash the batch concurrently, at most BULK_IMPORT_HASH_CONCURRENCY passwords at a time
+        hashes = await asyncio.gather(*(self._hash(user.password) for _, user in batch))
+        return [(line, user, hashed) for (line, user), hashed in zip(batch, hashes)]
+
+    def _copy_batch(self, connection, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for line, user, hashed in rows:
+            writer.writerow((line, user.name, user.email, user.location, user.about, hashed))
+        buffer.seek(0)
+
+        cursor = connection.cursor()
+        try:
+            cursor.execute(CREATE_STAGING_TABLE)
+            cursor.copy_expert(COPY_STAGING_TABLE, buffer)
+            cursor.execute(MERGE_STAGING_TABLE)
+            inserted = { email for (email,) in cursor.fetchall() }
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        return inserted
+
+    async def _load_batch(self, batch):
+        rows = await self._hash_batch(batch)
+        try:
+            if self._connection is None:
+                self._connection = await run_in_threadpool(engine.raw_connection)
+            inserted = await run_in_threadpool(self._copy_batch, self._connection, rows)
+        except (psycopg2.Error, SQLAlchemyError) as e:
+            # Report the batch as failed and carry on with the next one, on a new connection if this one broke
+            if self._connection is not None and self._connection.closed:
+                await run_in_threadpool(self._connection.invalidate)
+                self._connection = None
+            error = f"Could not be saved: {str(getattr(e, 'orig', None) or e).splitlines()[0]}"
+            for line, user, _ in rows:
+                self._error(line, error, user.email)
+            return
+        for line, user, _ in rows:
+            if user.email in inserted:
+                self.imported += 1
+                email_filter.add(user.email)
+            else:
+                self._error(line, "Email already registered.", user.email)
+
+    async def run(self, chunks):
+        """
+        Import every row from a stream of byte chunks.
+
+        - **chunks**: Async iterable of bytes holding NDJSON or CSV rows.
+
+        Returns:
+        - A report with received/imported/failed counts and the per-row errors.
+        """
+        try:
+            batch = []
+            seen = set()
+            loading = None
+            async for line, record in self._records(chunks):
+                try:
+                    data = self._parse(record)
+                except (ValueError, csv.Error) as e:
+                    self.received += 1
+                    self._error(line, f"Malformed row: {e}")
+                    continue
+                if data is None:
+                    continue
+
+                self.received += 1
+                if not isinstance(data, dict):
+                    self._error(line, "Row must be an object.")
+                    continue
+                try:
+                    user = schema_user(**data)
+                except ValidationError as e:
+                    self._error(line, [{ error["loc"][-1]: error["msg"] } for error in e.errors()])
+                    continue
+
+                # Repeated emails within a batch would be silently dropped by ON CONFLICT
+                if user.email in seen:
+                    self._error(line, "Duplicate email in import.", user.email)
+                    continue
+                seen.add(user.email)
+                batch.append((line, user))
+
+                if len(batch) >= self.batch_size:
+                    # Hash and copy this batch while the next one is being read and validated
+                    if loading:
+                        await loading
+                    loading = asyncio.ensure_future(self._load_batch(batch))
+                    batch = []
+                    seen = set()
+
+            if loading:
+                await loading
+            if batch:
+                await self._load_batch(batch)
+        finally:
+            # Never close the connection under a batch that is still being copied
+            if loading and not loading.done():
+                await asyncio.gather(loading, return_exceptions = True)
+            if self._connection is not None:
+                await run_in_threadpool(self._connection.close)
+
+        return {
+            "received": self.received,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key = lambda error: error["line"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
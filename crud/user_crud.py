@@ -1,19 +1,130 @@
+import orjson
+from datetime import datetime, timezone
 import psycopg2
-from core.database import engine
+from sqlalchemy import select, update, delete, exists, values, column, Integer, String, LargeBinary, DateTime
+from jose import JWTError
+from sqlalchemy.dialects.postgresql import insert
+from fastapi.responses import StreamingResponse, Response
+from core.config import settings
+from core.database import execute, commit, rollback, read_sessions, async_read_sessions
 from schemas import user_schema, token_schema
 from models import user_model
 from sqlalchemy.orm import Session
-from core.utils import responses
-from psycopg2 import OperationalError
+from core.utils import responses, StaticError, etag_matches, like_pattern, FastJSONResponse
 from core.security import (
-    verify_password, create_access_token, get_hash_password,
-    create_refresh_access_token, get_current_user, get_current_user_from_refresh_token
+    verify_and_update_password, create_access_token, get_hash_password,
+    create_refresh_access_token, get_current_user_from_refresh_token, invalidate_user,
+    token_digest, decode_access_token, token_cache, user_cache, load_user
 )
+from core.hashing import HashingOverloaded
+from core.revocation import revocation_list, expiry_datetime
+from core.email_filter import email_filter
+from core.write_queue import write_queue
 
 # Aliases for easier reference
 db_user = user_model.UserProfile
+db_refresh_token = user_model.RefreshAccessTokens
+db_revoked_token = user_model.RevokedTokens
 schema_user = user_schema.UserProfile
 
+# Static error responses, encoded once
+EMAIL_ALREADY_REGISTERED = StaticError(400, { "email": "Email already registered. Try logging in." })
+USER_NOT_FOUND = StaticError(404, { "error": "User not found. Try creating an account." })
+INVALID_CREDENTIALS = StaticError(401, { "error": "Invalid credentials. Try again..." })
+NO_USER_FOUND = StaticError(404, { "error": "No user found." })
+AUTHORIZATION_FAILED = StaticError(401, { "error": "Authorization failed. Log in again." })
+INVALID_TOKEN = StaticError(400, { "error": "Invalid token." })
+HASHING_BUSY = StaticError(503, { "error": "Server is busy. Try again shortly." }, headers = { "Retry-After": "1" })
+
+# Public profile columns returned by the user listing, never including the password hash
+user_list_columns = (db_user.user_id, db_user.name, db_user.email, db_user.location, db_user.about)
+
+# Rows fetched per round-trip from the server-side cursor when streaming the user listing
+STREAM_BATCH_SIZE = 1000
+
+
+def login_statement(email: str):
+    """
+    Select a user by email.
+    """
+    return select(db_user).where(db_user.email == email)
+
+
+def refresh_token_statement(digest: bytes):
+    """
+    Select the ID of a stored refresh token by its digest.
+    """
+    return select(db_refresh_token.tokenid).where(db_refresh_token.token_digest == digest)
+
+
+def profile_version_statement(user_id: int):
+    """
+    Select only the profile version of a user, enough to answer a conditional request.
+    """
+    return select(db_user.version).where(db_user.user_id == user_id)
+
+
+def search_statement(name: str = None, location: str = None, prefix: bool = False, after_id: int = 0, limit: int = 100):
+    """
+    Select one page of users whose name and/or location match the search terms case-insensitively,
+    ordered by user ID. The ILIKE conditions are served by the trigram indexes on both columns.
+    """
+    statement = select(*user_list_columns).where(db_user.user_id > after_id)
+    if name:
+        statement = statement.where(db_user.name.ilike(like_pattern(name, prefix), escape = "\\"))
+    if location:
+        statement = statement.where(db_user.location.ilike(like_pattern(location, prefix), escape = "\\"))
+    return statement.order_by(db_user.user_id).limit(limit)
+
+
+def profile_etag(user_id: int, version: int):
+    return f'W/"{user_id}-{version}"'
+
+
+def refresh_token_upsert(rows):
+    """
+    Store the refresh token digests of several users in one upsert, skipping users who logged out or had
+    a token revoked after the login that issued the refresh token. Logins and revocations compare the
+    application's clock with the database's, so both are assumed to be in sync.
+
+    The users' rows are locked first, against the lock taken by `logout`, so a logout either waits for
+    the upsert and deletes what it stored, or commits its revocation before the upsert checks for it.
+    """
+    issued = values(
+        column("user_id", Integer), column("token_digest", LargeBinary), column("issued_at", DateTime(timezone = True)),
+        name = "issued"
+    ).data([(row["user_id"], row["token_digest"], row["issued_at"]) for row in rows])
+    lock = select(db_user.user_id).where(
+        db_user.user_id.in_([row["user_id"] for row in rows])
+    ).order_by(db_user.user_id).with_for_update(key_share = True)
+    statement = insert(db_refresh_token).from_select(
+        ["user_id", "token_digest"],
+        select(issued.c.user_id, issued.c.token_digest).where(~exists().where(
+            db_revoked_token.user_id == issued.c.user_id, db_revoked_token.revoked_at >= issued.c.issued_at
+        ))
+    )
+    upsert = statement.on_conflict_do_update(
+        index_elements = [db_refresh_token.user_id], set_ = { "token_digest": statement.excluded.token_digest }
+    )
+    return [lock, upsert]
+
+
+def password_rehash_update(rows):
+    """
+    Replace the password hashes of several users in one UPDATE ... FROM (VALUES ...). Only the exact
+    hash that was verified is replaced, so a concurrent password change wins.
+    """
+    rehashed = values(
+        column("user_id", Integer), column("old_password", String), column("new_password", String), name = "rehashed"
+    ).data([(row["user_id"], row["old_password"], row["new_password"]) for row in rows])
+    return update(db_user).where(
+        db_user.user_id == rehashed.c.user_id, db_user.password == rehashed.c.old_password
+    ).values(password = rehashed.c.new_password).execution_options(synchronize_session = False)
+
+
+write_queue.register("refresh_token", refresh_token_upsert)
+write_queue.register("password_rehash", password_rehash_update)
+
 
 class CRUD:
     async def create_new_user(self, user: schema_user, db: Session):
@@ -21,89 +132,100 @@ class CRUD:
         Create a new user in the database.
 
         - **user**: UserProfile schema containing user data.
-        - **db**: SQLAlchemy database session.
+        - **db**: SQLAlchemy database session (sync Session or AsyncSession).
 
         Returns:
         - A JSONResponse indicating the result of the operation.
         """
         try:
-            # Check if the user already exists
-            existing_user = db.query(db_user).filter(db_user.email == user.email).one_or_none()
-            if existing_user:
-                return await responses(
-                    status_code = 400, error = { "email": "Email already registered. Try logging in." }
-                    )
-
-            # Hash the user's password and create a new user profile
+            # Hash the user's password and insert the profile in a single atomic statement;
+            # an existing email makes the insert a no-op that returns no row
             hashed_password = await get_hash_password(password = user.password)
-            db_object = user_model.UserProfile(
+            statement = insert(db_user).values(
                 name = user.name, email = user.email, location = user.location, about = user.about,
                 password = hashed_password
-            )
-            db.add(db_object)
-            db.commit()
-            db.refresh(db_object)
+            ).on_conflict_do_nothing(index_elements = [db_user.email]).returning(db_user.user_id)
+            result = await execute(db, statement)
+            user_id = result.scalar_one_or_none()
+            if user_id is None:
+                await rollback(db)
+                return await responses(error = EMAIL_ALREADY_REGISTERED)
+
+            await commit(db)
+            invalidate_user(user_id)
+            email_filter.add(user.email)
             return await responses(message = "User created successfully.", status_code = 201)
+        except HashingOverloaded:
+            await rollback(db)
+            return await responses(error = HASHING_BUSY)
         except psycopg2.Error as e:
-            db.rollback()
+            await rollback(db)
             return await responses(status_code = 500, error = { "Database Error": str(e) })
         except Exception as e:
-            db.rollback()
+            await rollback(db)
             return await responses(status_code = 500, error = { "error": str(e) })
 
-    async def authenticate_user(self, loginInfo: user_schema.Login, db: Session) -> user_schema.User:
+    async def authenticate_user(self, loginInfo: user_schema.Login, db: Session, read_db: Session = None):
         """
         Authenticate a user and generate access and refresh tokens.
 
         - **loginInfo**: Login schema containing user login details.
-        - **db**: SQLAlchemy database session.
+        - **db**: SQLAlchemy database session (sync Session or AsyncSession) on the primary.
+        - **read_db**: Optional read-only session used for the user lookup; a miss is re-checked on the
+          primary, so a user who has just registered can log in despite replication lag.
 
         Returns:
         - A JSONResponse with login status and user data.
         """
         try:
-            # Retrieve the user from the database
-            existing_user = db.query(db_user).filter(db_user.email == loginInfo.email).one_or_none()
+            # Emails the filter has not seen, and a batched primary lookup did not find, are not registered
+            if settings.EMAIL_FILTER_ENABLED and not await email_filter.might_exist(loginInfo.email):
+                return await responses(error = USER_NOT_FOUND)
+
+            # Retrieve the user
+            statement = login_statement(loginInfo.email)
+            existing_user = (await execute(read_db or db, statement)).scalar_one_or_none()
+            if not existing_user and read_db is not None and settings.DB_READ_REPLICA_URLS:
+                existing_user = (await execute(db, statement)).scalar_one_or_none()
             if not existing_user:
-                return await responses(
-                    status_code = 404, error = { "error": "User not found. Try creating an account." }
-                    )
+                return await responses(error = USER_NOT_FOUND)
 
-            # Verify the provided password
-            is_authorized = await verify_password(loginInfo.password, existing_user.password)
+            # Verify the provided password, rehashing it if it was stored with an outdated scheme or cost
+            is_authorized, new_hash = await verify_and_update_password(loginInfo.password, existing_user.password)
             if not is_authorized:
-                return await responses(
-                    status_code = 401, error = { "error": "Invalid credentials. Try again..." }
-                )
+                return await responses(error = INVALID_CREDENTIALS)
+
+            # Every login issues a new refresh token, replacing the user's previous one; only its digest is stored
+            refresh_token = await create_refresh_access_token(data = { "id": existing_user.user_id })
+            digest = token_digest(refresh_token)
 
-            # Check if a refresh token exists for the user, create one if not
-            check_refresh_token = db.query(user_model.RefreshAccessTokens).join(user_model.UserProfile).filter(
-                user_model.UserProfile.user_id == existing_user.user_id
-            ).one_or_none()
-            if not check_refresh_token:
-                refresh_token = await create_refresh_access_token(data = { "id": existing_user.user_id })
-                print("refresh token: ", refresh_token)
-                db_refresh_token = user_model.RefreshAccessTokens(
-                    tokens = refresh_token, user_id = existing_user.user_id
-                    )
-                db.add(db_refresh_token)
-                db.commit()
-                db.refresh(db_refresh_token)
-                check_refresh_token = db_refresh_token
-
-            print(check_refresh_token.tokens)
+            # Both writes can go through the write queue: a lost rehash is redone by the next login, and a
+            # lost refresh token digest only means logging in again once the access token expires
+            writes = []
+            if new_hash:
+                writes.append(("password_rehash", existing_user.user_id, {
+                    "user_id": existing_user.user_id, "old_password": existing_user.password, "new_password": new_hash
+                }))
+            writes.append(("refresh_token", existing_user.user_id, {
+                "user_id": existing_user.user_id, "token_digest": digest, "issued_at": datetime.now(timezone.utc)
+            }))
+            await write_queue.submit(writes, db)
 
             # Generate access token
             access_token = await create_access_token(data = { "id": existing_user.user_id })
-            token = token_schema.RefreshToken(token = access_token, refreshToken = check_refresh_token.tokens)
+            token = token_schema.RefreshToken(token = access_token, refreshToken = refresh_token)
 
             # Return the user data and tokens
             user = user_schema.User(
                 name = existing_user.name, location = existing_user.location, email = existing_user.email,
                 about = existing_user.about, user_token = token
             )
-            return await responses(message = "Login successful.", status_code = 200, data = user.dict())
+            return await responses(message = "Login successful.", status_code = 200, data = user)
+        except HashingOverloaded:
+            await rollback(db)
+            return await responses(error = HASHING_BUSY)
         except Exception as e:
+            await rollback(db)
             return await responses(status_code = 500, error = { "error": str(e) })
 
     async def refresh_expired_token(self, token: token_schema.AccessToken, db: Session):
@@ -111,7 +233,7 @@ class CRUD:
         Refresh an expired access token using a refresh token.
 
         - **token**: AccessToken schema containing the refresh token.
-        - **db**: SQLAlchemy database session.
+        - **db**: SQLAlchemy database session (sync Session or AsyncSession).
 
         Returns:
         - A JSONResponse with the new access token and user data.
@@ -120,14 +242,17 @@ class CRUD:
             # Get the current user based on the refresh token
             current_user = await get_current_user_from_refresh_token(token = token.token, db = db)
             if not current_user:
-                return await responses(status_code = 404, error = { "error": "No user found." })
+                return await responses(error = NO_USER_FOUND)
 
-            # Check if the refresh token exists in the database
-            token_check_in_db = db.query(user_model.RefreshAccessTokens).join(user_model.UserProfile).filter(
-                user_model.UserProfile.user_id == current_user.user_id
-            ).one_or_none()
+            # Check if the refresh token exists in the database, by its digest
+            result = await execute(db, refresh_token_statement(token_digest(token.token)))
+            token_check_in_db = result.scalar_one_or_none()
+            if not token_check_in_db:
+                # The digest of a login that has just happened may still be in the write queue
+                queued = write_queue.pending("refresh_token", current_user.user_id)
+                token_check_in_db = queued is not None and queued["token_digest"] == token_digest(token.token)
             if not token_check_in_db:
-                return await responses(status_code = 401, error = { "error": "Authorization failed. Log in again." })
+                return await responses(error = AUTHORIZATION_FAILED)
 
             # Generate a new access token
             refreshed_token = await create_access_token(data = { "id": current_user.user_id })
@@ -136,10 +261,182 @@ class CRUD:
             # Return the user data and new token
             user = user_schema.User(
                 name = current_user.name, location = current_user.location, email = current_user.email,
-                about = current_user.about, user_token = token.dict()
+                about = current_user.about, user_token = token
             )
-            return await responses(message = "Login successful.", status_code = 200, data = user.dict())
+            return await responses(message = "Login successful.", status_code = 200, data = user)
         except Exception as e:
             return await responses(
                 status_code = 500, error = { "error": f"Failed to refresh the token. Please log in again. {e}" }
                 )
+
+    async def logout(self, token: str, token_data: token_schema.TokenData, db: Session):
+        """
+        Log a user out: revoke their current access token and delete their refresh token.
+
+        - **token**: The bearer access token of the request.
+        - **token_data**: The verified claims of that token.
+        - **db**: SQLAlchemy database session (sync Session or AsyncSession) on the primary.
+
+        Returns:
+        - A JSONResponse indicating the result of the operation.
+        """
+        try:
+            # Lock the user against queued refresh token writes of any worker; once the revocation commits they
+            # skip the logins made before it
+            await execute(db, select(db_user.user_id).where(db_user.user_id == token_data.id).with_for_update())
+            await revocation_list.revoke(token_data.jti, token_data.id, expiry_datetime(token_data.exp), db)
+            # Drop this worker's queued write right away rather than leave it to the flush
+            await write_queue.discard("refresh_token", token_data.id)
+            await execute(db, delete(db_refresh_token).where(db_refresh_token.user_id == token_data.id))
+            await commit(db)
+            token_cache.pop(token_digest(token))
+            return await responses(message = "Logged out.", status_code = 200)
+        except Exception as e:
+            await rollback(db)
+            return await responses(status_code = 500, error = { "error": str(e) })
+
+    async def revoke_token(self, token: token_schema.AccessToken, db: Session):
+        """
+        Revoke an access token. Holding the token is what authorizes revoking it.
+
+        - **token**: AccessToken schema containing the access token to revoke.
+        - **db**: SQLAlchemy database session (sync Session or AsyncSession) on the primary.
+
+        Returns:
+        - A JSONResponse indicating the result of the operation; already expired tokens need no revocation.
+        """
+        try:
+            token_data = decode_access_token(token.token, verify_exp = False)
+        except JWTError:
+            return await responses(error = INVALID_TOKEN)
+
+        try:
+            if expiry_datetime(token_data.exp) > datetime.now(timezone.utc):
+                await revocation_list.revoke(token_data.jti, token_data.id, expiry_datetime(token_data.exp), db)
+                await commit(db)
+            token_cache.pop(token_digest(token.token))
+            return await responses(message = "Token revoked.", status_code = 200)
+        except Exception as e:
+            await rollback(db)
+            return await responses(status_code = 500, error = { "error": str(e) })
+
+    async def get_profile(self, user_id: int, db: Session, if_none_match: str = None):
+        """
+        Return a user's profile with an ETag, or 304 Not Modified if the client's copy is current.
+
+        - **user_id**: The ID of the authenticated user.
+        - **db**: SQLAlchemy database session (sync Session or AsyncSession).
+        - **if_none_match**: The `If-None-Match` request header, if any.
+
+        Returns:
+        - A 304 response without a body when the ETag matches; otherwise the UserBasicInfo JSON.
+          A conditional request missing the user cache only looks up the version, not the whole row.
+        """
+        try:
+            user = user_cache.get(user_id)
+            if if_none_match:
+                if user is not None:
+                    version = user.version
+                else:
+                    version = (await execute(db, profile_version_statement(user_id))).scalar_one_or_none()
+                if version is not None and etag_matches(if_none_match, profile_etag(user_id, version)):
+                    return Response(status_code = 304, headers = { "ETag": profile_etag(user_id, version) })
+
+            if user is None:
+                user = await load_user(user_id, db)
+                if user is None:
+                    return await responses(error = NO_USER_FOUND)
+
+            profile = user_schema.UserBasicInfo(name = user.name, email = user.email, about = user.about, location = user.location)
+            return FastJSONResponse(
+                content = profile, headers = { "ETag": profile_etag(user_id, user.version), "Cache-Control": "private, no-cache" }
+                )
+        except Exception as e:
+            return await responses(status_code = 500, error = { "error": str(e) })
+
+    async def list_users(self, db: Session, after_id: int = 0, limit: int = 100):
+        """
+        Return one page of users, ordered by user ID, using keyset pagination.
+
+        - **db**: SQLAlchemy database session (sync Session or AsyncSession).
+        - **after_id**: Only users with a greater user ID are returned (the previous page's `next_after_id`).
+        - **limit**: Maximum number of users in the page.
+
+        Returns:
+        - A JSONResponse with the users and the `next_after_id` cursor, which is null on the last page.
+        """
+        try:
+            result = await execute(db, select(*user_list_columns).where(
+                db_user.user_id > after_id
+            ).order_by(db_user.user_id).limit(limit))
+            users = result.all()
+            next_after_id = users[-1].user_id if len(users) == limit else None
+            return await responses(
+                message = "Users retrieved.", status_code = 200, data = { "users": users, "next_after_id": next_after_id }
+                )
+        except Exception as e:
+            return await responses(status_code = 500, error = { "error": str(e) })
+
+    async def search_users(
+        self, db: Session, name: str = None, location: str = None, prefix: bool = False, after_id: int = 0, limit: int = 100
+    ):
+        """
+        Return one page of users matching a name and/or location search, using keyset pagination.
+
+        - **db**: SQLAlchemy database session (sync Session or AsyncSession).
+        - **name**: Text the user's name must contain (or start with, see `prefix`).
+        - **location**: Text the user's location must contain (or start with, see `prefix`).
+        - **prefix**: Match names and locations starting with the terms instead of containing them.
+        - **after_id**: Only users with a greater user ID are returned (the previous page's `next_after_id`).
+        - **limit**: Maximum number of users in the page.
+
+        Returns:
+        - A JSONResponse with the matching users and the `next_after_id` cursor, which is null on the last page.
+        """
+        if not name and not location:
+            return await responses(status_code = 400, error = { "error": "Provide a name or location to search for." })
+        try:
+            result = await execute(db, search_statement(
+                name = name, location = location, prefix = prefix, after_id = after_id, limit = limit
+            ))
+            users = result.all()
+            next_after_id = users[-1].user_id if len(users) == limit else None
+            return await responses(
+                message = "Users retrieved.", status_code = 200, data = { "users": users, "next_after_id": next_after_id }
+                )
+        except Exception as e:
+            return await responses(status_code = 500, error = { "error": str(e) })
+
+    def stream_users(self, after_id: int = 0):
+        """
+        Stream every user after `after_id` as NDJSON, ordered by user ID.
+
+        Rows are read through a server-side cursor in batches of STREAM_BATCH_SIZE, so memory stays flat
+        regardless of table size. The stream opens its own read-only session because it outlives the
+        request's dependencies.
+
+        - **after_id**: Only users with a greater user ID are streamed.
+
+        Returns:
+        - A StreamingResponse with one JSON object per line.
+        """
+        statement = select(*user_list_columns).where(
+            db_user.user_id > after_id
+        ).order_by(db_user.user_id).execution_options(yield_per = STREAM_BATCH_SIZE)
+
+        def encode(partition):
+            return b"".join(orjson.dumps(dict(row)) + b"\n" for row in partition)
+
+        def sync_rows():
+            with next(read_sessions)() as db:
+                for partition in db.execute(statement).mappings().partitions():
+                    yield encode(partition)
+
+        async def async_rows():
+            async with next(async_read_sessions)() as db:
+                result = await db.stream(statement)
+                async for partition in result.mappings().partitions():
+                    yield encode(partition)
+
+        rows = async_rows() if settings.DB_ASYNC else sync_rows()
+        return StreamingResponse(rows, media_type = "application/x-ndjson")
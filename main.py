@@ -1,47 +1,41 @@
+import time
+import asyncio
 from fastapi import FastAPI, Request
-import psycopg2
-from core.config import settings
+from fastapi.concurrency import run_in_threadpool
 from fastapi.exceptions import RequestValidationError
 from api.v1.api_register import userRouter
-from fastapi.responses import RedirectResponse
-from models.user_model import base
-from core.utils import responses
-from core.database import engine
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
-
-app = FastAPI()
-
-# Database connection parameters from settings
-DB_PASSWORD = settings.DB_PASSWORD
-DB_HOST = settings.DB_HOST
-DB_USER = settings.DB_USER
-DATABASE_NAME = settings.DB_NAME
-DB_PORT = settings.DB_PORT
-
-
-def create_database_if_not_exists():
-    """
-    Connects to PostgreSQL, checks if the specified database exists,
-    and creates it if it doesn't. Also creates the necessary tables.
-    """
-    conn = psycopg2.connect(dbname = "postgres", user = DB_USER, password = DB_PASSWORD, host = DB_HOST, port = DB_PORT)
-    conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)  # Allows database creation without a transaction
-    cursor = conn.cursor()
-    print("Creating the database...")
-
-    # Check if the database already exists
-    cursor.execute(f"SELECT 1 FROM pg_catalog.pg_database WHERE datname = '{DATABASE_NAME}'")
-    exists = cursor.fetchone()
-    if not exists:
-        # Create the database if it does not exist
-        cursor.execute(f'CREATE DATABASE {DATABASE_NAME}')
-        print(f"Database {DATABASE_NAME} created.")
-
-    # Create tables if they do not exist
-    base.metadata.create_all(bind = engine)
-
-    cursor.close()
-    conn.close()
+from fastapi.responses import RedirectResponse, PlainTextResponse
+from core.bootstrap import bootstrap_schema
+from core.utils import responses, FastJSONResponse
+from core.database import async_engine, async_replica_engines
+from core.hashing import hashing_executor, calibrate
+from core.config import settings
+from core.security import token_cache, user_cache
+from core.tokens import access_token_keys
+from core.revocation import revocation_list
+from core.email_filter import email_filter
+from core.throttle import LoginThrottled
+from core.write_queue import write_queue
+from core.warmup import warm_up
+from core import metrics
+
+app = FastAPI(default_response_class = FastJSONResponse)
+
+# Reported by /health/ready; set once startup, including warm-up, has completed
+app.state.ready = False
+
+# Record per-route latency, in-flight requests and per-request database work
+app.add_middleware(metrics.MetricsMiddleware)
+
+# The sampling profiler and its endpoints are not even imported unless enabled
+if settings.PROFILING_ENABLED:
+    from core.profiler import profiler, ProfilingMiddleware
+    from api.v1.endpoints.profile_api import profileRouter
+    app.add_middleware(
+        ProfilingMiddleware, profiler = profiler, sample_rate = settings.PROFILING_SAMPLE_RATE,
+        exclude_prefix = "/api/v1/debug/profiles"
+    )
+    app.include_router(profileRouter, prefix = "/api/v1")
 
 
 # Event handler for application startup
@@ -49,10 +43,66 @@ def create_database_if_not_exists():
 async def startup():
     """
     Event handler that runs on application startup.
-    Calls the function to create the database and tables if they do not exist.
+    Brings the database schema up to date (creating the database if needed), optionally calibrates
+    the password hash cost, loads the token revocation list, warms up the request paths and reports how
+    long each startup phase took. The application reports ready only once this has completed.
     """
     print("Starting up application...")
-    create_database_if_not_exists()
+    start = time.perf_counter()
+
+    # Schema bootstrap is blocking database work, keep it off the event loop
+    report = await run_in_threadpool(bootstrap_schema)
+    metrics.startup_duration.set(report["duration_ms"] / 1000, "schema")
+
+    # Optionally time a password hash on this host against the latency target
+    if settings.PASSWORD_HASH_CALIBRATE:
+        calibration_start = time.perf_counter()
+        report["password_hash"] = await run_in_threadpool(calibrate, settings.PASSWORD_HASH_TARGET_MS)
+        metrics.startup_duration.set(time.perf_counter() - calibration_start, "calibration")
+
+    # Load the revoked token IDs, then keep them in sync with other workers in the background
+    await run_in_threadpool(revocation_list.rebuild)
+    app.state.revocation_task = asyncio.create_task(revocation_list.run())
+
+    # The email filter is built in the background; logins query the database until it is ready
+    app.state.email_filter_task = None
+    if settings.EMAIL_FILTER_ENABLED:
+        app.state.email_filter_task = asyncio.create_task(email_filter.run())
+
+    # Login-side writes are group-committed in the background unless WRITE_QUEUE_DURABILITY is 'inline'
+    write_queue.start()
+
+    # Pay connection, JWT, hashing and query compilation setup costs before taking traffic
+    if settings.WARMUP_ENABLED:
+        warmup_start = time.perf_counter()
+        report["warmup"] = await warm_up()
+        metrics.startup_duration.set(time.perf_counter() - warmup_start, "warmup")
+
+    report["startup_ms"] = (time.perf_counter() - start) * 1000
+    metrics.startup_duration.set(report["startup_ms"] / 1000, "total")
+    app.state.startup_report = report
+    app.state.ready = True
+    print(f"Startup report: {report}")
+
+
+# Event handler for application shutdown
+@app.on_event("shutdown")
+async def shutdown():
+    """
+    Event handler that runs on application shutdown.
+    Stops the revocation and email filter sync tasks, flushes the write queue, stops the password hashing worker
+    pool and closes pooled async database connections.
+    """
+    app.state.ready = False
+    app.state.revocation_task.cancel()
+    if app.state.email_filter_task is not None:
+        app.state.email_filter_task.cancel()
+    await write_queue.close()
+    hashing_executor.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
+    for replica in async_replica_engines:
+        await replica.dispose()
 
 
 # Include user-related routes
@@ -77,6 +127,23 @@ async def handle_request_error(request: Request, exc: RequestValidationError):
     return await responses(status_code = 422, error = errors)
 
 
+@app.exception_handler(LoginThrottled)
+async def handle_login_throttled(request: Request, exc: LoginThrottled):
+    """
+    Exception handler for throttled login attempts.
+
+    - **request**: The throttled request.
+    - **exc**: The exception instance, carrying the seconds until another attempt is admitted.
+
+    Returns:
+    - A JSON error response with a 429 status code and a `Retry-After` header.
+    """
+    return await responses(
+        status_code = 429, error = { "error": "Too many login attempts. Try again later." },
+        headers = { "Retry-After": str(exc.retry_after) }
+    )
+
+
 @app.get("/")
 async def redirect_url():
     """
@@ -86,3 +153,68 @@ async def redirect_url():
     - A redirect response to the /docs endpoint.
     """
     return RedirectResponse(url = "/docs")
+
+
+@app.get("/health/live", include_in_schema = False)
+async def liveness():
+    """
+    Liveness probe: the process is up and serving requests.
+    """
+    return { "status": "ok" }
+
+
+@app.get("/health/ready", include_in_schema = False)
+async def readiness():
+    """
+    Readiness probe: startup, including the warm-up phase, has completed.
+
+    Returns:
+    - 200 when ready, 503 while starting or shutting down.
+    """
+    if not app.state.ready:
+        return FastJSONResponse({ "status": "starting" }, status_code = 503)
+    return { "status": "ready" }
+
+
+@app.get("/.well-known/jwks.json", include_in_schema = False)
+async def get_jwks():
+    """
+    Publish the public access token keys, so other services can verify tokens without calling this one.
+
+    Returns:
+    - A JWKS document with the ES256/RS256 keys of the key ring; it is empty while tokens are signed
+      with a shared HMAC secret.
+    """
+    return FastJSONResponse(access_token_keys.jwks(), headers = { "Cache-Control": "public, max-age=300" })
+
+
+@metrics.registry.add_collector
+def collect_component_metrics():
+    """
+    Refresh cache, hashing queue, write queue and Bloom filter gauges at scrape time.
+    """
+    for name, cache in (("token", token_cache), ("user", user_cache)):
+        metrics.cache_entries.set(len(cache), name)
+        metrics.cache_hits.set(cache.hits, name)
+        metrics.cache_misses.set(cache.misses, name)
+    metrics.password_hash_queue_depth.set(hashing_executor.stats()["queue_depth"])
+    metrics.write_queue_depth.set(write_queue.depth())
+    filters = [("revocation", revocation_list.filter)]
+    if email_filter.ready:
+        filters.append(("email", email_filter.filter))
+    for name, bloom in filters:
+        metrics.bloom_filter_entries.set(len(bloom), name)
+        metrics.bloom_filter_memory_bytes.set(bloom.memory_bytes, name)
+        metrics.bloom_filter_false_positive_rate.set(bloom.false_positive_rate(), name)
+
+
+@app.get("/metrics", include_in_schema = False)
+async def get_metrics():
+    """
+    Expose application metrics in the Prometheus text format.
+
+    Returns:
+    - Request latency histograms, database query and pool checkout timings, hashing timings and
+      cache counters.
+    """
+    return PlainTextResponse(metrics.registry.render(), media_type = "text/plain; version=0.0.4")
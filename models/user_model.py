@@ -1,6 +1,21 @@
-from sqlalchemy import Column, Text, Integer, String, ForeignKey
+from sqlalchemy import Column, Text, Integer, String, ForeignKey, LargeBinary, DateTime, Index, func, text
 from core.database import base
 
+
+def _trigram_available(ddl, target, bind, **kw):
+    # Trigram indexes need the pg_trgm extension, which the schema bootstrap installs when the server has it
+    return bind.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+
+
+def trigram_index(name: str, column: str):
+    """
+    Declare a GIN trigram index serving ILIKE prefix and substring searches on a column. It is only created
+    when the pg_trgm extension is installed.
+    """
+    return Index(
+        name, column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"}
+    ).ddl_if(callable_=_trigram_available)
+
 class UserProfile(base):
     """
     Represents a user profile in the database.
@@ -12,6 +27,9 @@ class UserProfile(base):
     - **location**: Location of the user (non-nullable).
     - **about**: Optional text field for additional information about the user.
     - **password**: Hashed password of the user (non-nullable).
+    - **version**: Profile version, incremented by the ORM on every update; exposed as the ETag of `/me`.
+
+    `name` and `location` carry trigram indexes for the user search.
     """
     __tablename__ = 'users'
 
@@ -21,6 +39,13 @@ class UserProfile(base):
     location = Column(String, nullable=False)
     about = Column(Text, nullable=True)
     password = Column(String, nullable=False)
+    version = Column(Integer, nullable=False, server_default="1")
+
+    __table_args__ = (
+        trigram_index("ix_users_name_trgm", "name"),
+        trigram_index("ix_users_location_trgm", "location"),
+    )
+    __mapper_args__ = {"version_id_col": version}
 
 
 class RefreshAccessTokens(base):
@@ -29,13 +54,38 @@ class RefreshAccessTokens(base):
 
     Attributes:
     - **tokenid**: Unique identifier for the refresh token, auto-incremented.
-    - **tokens**: The refresh token itself, unique.
+    - **token_digest**: SHA-256 digest of the refresh token (32 bytes), unique and indexed; the token itself is never stored.
     - **type**: Type of token (default is "Bearer").
-    - **user_id**: Foreign key linking to the user who owns this refresh token.
+    - **user_id**: Foreign key linking to the user who owns this refresh token, unique and indexed.
     """
     __tablename__ = 'refreshaccesstokens'
 
     tokenid = Column(Integer, primary_key=True, autoincrement=True, index=True)
-    tokens = Column(Text, unique=True)
+    token_digest = Column(LargeBinary, unique=True, index=True, nullable=False)
     type = Column(String, default="Bearer")
-    user_id = Column(Integer, ForeignKey('users.user_id'))
+    user_id = Column(Integer, ForeignKey('users.user_id'), unique=True, index=True)
+
+
+class RevokedTokens(base):
+    """
+    Represents a revoked access token, kept until the token would have expired.
+
+    Attributes:
+    - **jti**: The token ID (`jti` claim) of the revoked token.
+    - **user_id**: Foreign key linking to the user the token was issued to.
+    - **expires_at**: When the token expires; the row is pruned after that.
+    - **revoked_at**: When the token was revoked, used to sync the revocation filter of each worker.
+
+    `(user_id, revoked_at)` is indexed for the queued refresh token writes, which are skipped when the
+    user has logged out since the login that queued them.
+    """
+    __tablename__ = 'revokedtokens'
+
+    jti = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.user_id'), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+
+    __table_args__ = (
+        Index("ix_revokedtokens_user_id_revoked_at", "user_id", "revoked_at"),
+    )
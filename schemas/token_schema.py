@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class TokenData(BaseModel):
@@ -6,8 +7,12 @@ class TokenData(BaseModel):
 
     Attributes:
     - **id**: The unique identifier for the user associated with the token.
+    - **jti**: The unique identifier of the token itself, used for revocation.
+    - **exp**: The expiry time of the token as a Unix timestamp.
     """
     id: int
+    jti: Optional[str] = None
+    exp: Optional[int] = None
 
 class AccessToken(BaseModel):
     """
@@ -79,6 +79,18 @@ class Login(BaseModel):
     password: str
 
 
+class CurrentUser(UserBasicInfo):
+    """
+    Snapshot of an authenticated user's profile, as held in the user cache.
+
+    Attributes:
+    - **user_id**: The unique identifier of the user.
+    - **version**: The profile version, used as the ETag of `/me`.
+    """
+    user_id: int
+    version: int
+
+
 class User(UserBasicInfo):
     """
     User information including authentication tokens.
@@ -0,0 +1,43 @@
+import pytest
+from core.bloom import BloomFilter
+
+
+def test_added_items_are_always_members():
+    bloom = BloomFilter(1000, 0.01)
+    items = [f"item-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert len(bloom) == 1000
+
+
+def test_str_and_bytes_items_are_interchangeable():
+    bloom = BloomFilter(10)
+    bloom.add("jti")
+    assert b"jti" in bloom
+
+
+def test_empty_filter_has_no_members():
+    bloom = BloomFilter(1000, 0.01)
+    assert "anything" not in bloom
+    assert bloom.false_positive_rate() == 0.0
+
+
+def test_false_positive_rate_at_capacity():
+    bloom = BloomFilter(2000, 0.01)
+    for i in range(2000):
+        bloom.add(f"member-{i}")
+    # The estimate is close to the target at capacity, and the measured rate is close to the estimate
+    assert bloom.false_positive_rate() == pytest.approx(0.01, rel = 0.2)
+    measured = sum(f"other-{i}" in bloom for i in range(20000)) / 20000
+    assert measured == pytest.approx(bloom.false_positive_rate(), abs = 0.005)
+
+
+def test_false_positive_rate_grows_past_capacity():
+    bloom = BloomFilter(100, 0.01)
+    for i in range(100):
+        bloom.add(f"member-{i}")
+    at_capacity = bloom.false_positive_rate()
+    for i in range(100, 400):
+        bloom.add(f"member-{i}")
+    assert bloom.false_positive_rate() > 10 * at_capacity
@@ -0,0 +1,97 @@
+import pytest
+from core import cache
+from core.cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def test_evicts_least_recently_used_at_maxsize(clock):
+    lru = TTLCache(maxsize = 2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    # Reading "a" makes "b" the least recently used entry
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert len(lru) == 2
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+    assert lru.evictions == 1
+
+
+def test_overwriting_a_key_does_not_evict(clock):
+    lru = TTLCache(maxsize = 2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.set("a", 10)
+    assert lru.evictions == 0
+    assert lru.get("a") == 10
+    assert lru.get("b") == 2
+
+
+def test_entries_expire_after_the_default_ttl(clock):
+    expiring = TTLCache(maxsize = 10, ttl = 5)
+    expiring.set("a", 1)
+    clock.now += 4.9
+    assert expiring.get("a") == 1
+    clock.now += 0.1
+    assert expiring.get("a") is None
+    assert len(expiring) == 0
+
+
+def test_per_entry_ttl_overrides_the_default(clock):
+    expiring = TTLCache(maxsize = 10, ttl = 5)
+    expiring.set("short", 1, ttl = 1)
+    expiring.set("long", 2, ttl = 60)
+    expiring.set("default", 3)
+    clock.now += 10
+    assert expiring.get("short") is None
+    assert expiring.get("default") is None
+    assert expiring.get("long") == 2
+
+
+def test_entries_without_ttl_never_expire(clock):
+    forever = TTLCache(maxsize = 10)
+    forever.set("a", 1)
+    clock.now += 10 ** 9
+    assert forever.get("a") == 1
+
+
+def test_hit_and_miss_counters(clock):
+    counted = TTLCache(maxsize = 10, ttl = 5)
+    counted.set("a", 1)
+    assert counted.get("a") == 1
+    assert counted.get("missing", "default") == "default"
+    clock.now += 5
+    # An expired entry counts as a miss
+    assert counted.get("a") is None
+    stats = counted.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 0)
+    assert stats["hit_ratio"] == pytest.approx(1 / 3)
+
+
+def test_zero_maxsize_disables_the_cache(clock):
+    disabled = TTLCache(maxsize = 0)
+    disabled.set("a", 1)
+    assert disabled.get("a") is None
+    assert disabled.stats()["hit_ratio"] == 0.0
+
+
+def test_pop_removes_an_entry(clock):
+    lru = TTLCache(maxsize = 10)
+    lru.set("a", 1)
+    assert lru.pop("a") == 1
+    assert lru.pop("a", "gone") == "gone"
@@ -0,0 +1,91 @@
+import asyncio
+import csv
+import pytest
+from crud.import_crud import iter_csv_records, iter_lines
+
+
+async def stream(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def collect(records):
+    async def gather():
+        return [record async for record in records]
+    return asyncio.run(gather())
+
+
+def csv_records(data: bytes, size: int = 3, max_bytes: int = 64):
+    return collect(iter_csv_records(stream(data, size), max_bytes = max_bytes))
+
+
+def errors(records):
+    return [(number, type(record), str(record)) for number, record in records if isinstance(record, Exception)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_csv_crlf_line_endings(size):
+    assert csv_records(b"name,email\r\nAnn,ann@example.com\r\nBob,bob@example.com\r\n", size) == [
+        (1, ["name", "email"]), (2, ["Ann", "ann@example.com"]), (3, ["Bob", "bob@example.com"]),
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_csv_quoted_fields_span_lines(size):
+    data = b'name,about\r\nAnn,"Line one\r\n\r\nline ""two"""\r\nBob,plain\n'
+    assert csv_records(data, size) == [
+        (1, ["name", "about"]), (2, ["Ann", 'Line one\r\n\r\nline "two"']), (5, ["Bob", "plain"]),
+    ]
+
+
+def test_csv_blank_lines_between_records_are_skipped():
+    assert csv_records(b"a,b\n\n\r\n1,2\n\n") == [(1, ["a", "b"]), (4, ["1", "2"])]
+
+
+def test_csv_last_line_without_newline():
+    assert csv_records(b"a,b\n1,2") == [(1, ["a", "b"]), (2, ["1", "2"])]
+
+
+def test_csv_unterminated_quote_is_malformed():
+    records = csv_records(b'a,b\n1,"open\n2,3\n')
+    assert records[0] == (1, ["a", "b"])
+    assert errors(records) == [(2, csv.Error, "Unterminated quoted field.")]
+
+
+def test_csv_invalid_utf8_is_reported_and_parsing_continues():
+    records = csv_records(b"a,b\n1,\xff\n2,ok\n")
+    assert errors(records) == [(2, ValueError, "Invalid UTF-8 at byte 2.")]
+    assert records[-1] == (3, ["2", "ok"])
+
+
+def test_csv_invalid_utf8_ends_an_open_quoted_field():
+    records = csv_records(b'1,"open\n\xff\n2,ok\n')
+    assert errors(records) == [
+        (1, csv.Error, "Unterminated quoted field."), (2, ValueError, "Invalid UTF-8 at byte 0."),
+    ]
+    assert records[-1] == (3, ["2", "ok"])
+
+
+def test_csv_overlong_line_is_reported():
+    records = csv_records(b"1," + b"x" * 100 + b"\n2,ok\n", max_bytes = 32)
+    assert errors(records) == [(1, ValueError, "Row is longer than 32 bytes.")]
+    assert records[-1] == (2, ["2", "ok"])
+
+
+def test_csv_overlong_quoted_record_is_skipped_to_its_closing_quote():
+    records = csv_records(b'1,"' + b"x\n" * 40 + b'"\n2,ok\n', max_bytes = 32)
+    assert records == [(1, records[0][1]), (42, ["2", "ok"])]
+    assert errors(records) == [(1, ValueError, "Row is longer than 32 bytes.")]
+
+
+@pytest.mark.parametrize("size", [1, 1000])
+def test_lines_skip_blanks_and_strip_line_endings(size):
+    lines = collect(iter_lines(stream(b'{"a": 1}\r\n\n  \n{"b": 2}', size), max_bytes = 64))
+    assert lines == [(1, '{"a": 1}'), (4, '{"b": 2}')]
+
+
+def test_lines_report_unreadable_lines():
+    lines = collect(iter_lines(stream(b'{"a": 1}\n\xc3\n' + b"y" * 100 + b'\n{"b": 2}\n', 7), max_bytes = 32))
+    assert [(number, str(line)) for number, line in lines] == [
+        (1, '{"a": 1}'), (2, "Invalid UTF-8 at byte 0."), (3, "Row is longer than 32 bytes."), (4, '{"b": 2}'),
+    ]
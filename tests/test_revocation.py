@@ -0,0 +1,46 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text
+from core.revocation import RevocationList, expiry_datetime
+
+
+def insert_revocation(engine, user_id, expires_at):
+    jti = uuid.uuid4().hex
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO revokedtokens (jti, user_id, expires_at) VALUES (:jti, :user_id, :expires_at)"
+        ), { "jti": jti, "user_id": user_id, "expires_at": expires_at })
+    return jti
+
+
+def stored(engine, jti):
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT 1 FROM revokedtokens WHERE jti = :jti"), { "jti": jti }).scalar() is not None
+
+
+def test_sync_picks_up_other_workers_revocations(engine, user_id):
+    revocations = RevocationList(1000, 0.001)
+    revocations.sync()
+    jti = insert_revocation(engine, user_id, datetime.now(timezone.utc) + timedelta(minutes = 5))
+    assert jti not in revocations.filter
+    revocations.sync()
+    assert jti in revocations.filter
+
+
+def test_rebuild_prunes_expired_revocations(engine, user_id):
+    now = datetime.now(timezone.utc)
+    live = insert_revocation(engine, user_id, now + timedelta(minutes = 5))
+    expired = insert_revocation(engine, user_id, now - timedelta(minutes = 5))
+    revocations = RevocationList(1000, 0.001)
+    revocations.sync()
+    assert expired in revocations.filter
+
+    revocations.rebuild()
+    assert not stored(engine, expired)
+    assert stored(engine, live)
+    assert live in revocations.filter
+    assert expired not in revocations.filter
+
+
+def test_expiry_datetime_is_utc():
+    assert expiry_datetime(0) == datetime(1970, 1, 1, tzinfo = timezone.utc)
@@ -0,0 +1,71 @@
+from core.throttle import SlidingWindowLimiter
+
+
+def limiter(limit = 3, window = 60, max_keys = 100):
+    return SlidingWindowLimiter(limit, window, max_keys)
+
+
+def test_admits_up_to_the_limit():
+    throttle = limiter()
+    for _ in range(3):
+        assert throttle.retry_after("a", now = 0) == 0
+        throttle.hit("a", now = 0)
+    assert throttle.retry_after("a", now = 0) > 0
+
+
+def test_keys_are_independent():
+    throttle = limiter()
+    for _ in range(3):
+        throttle.hit("a", now = 0)
+    assert throttle.retry_after("b", now = 0) == 0
+
+
+def test_retry_after_a_full_window_waits_for_the_next_window_to_decay():
+    throttle = limiter()
+    for _ in range(3):
+        throttle.hit("a", now = 0)
+    assert throttle.retry_after("a", now = 0) == 61
+    # At the window boundary the previous count still weighs fully
+    assert throttle.retry_after("a", now = 60) > 0
+    assert throttle.retry_after("a", now = 61) == 0
+
+
+def test_retry_after_is_when_the_request_is_admitted():
+    def busy():
+        throttle = limiter(limit = 5, window = 10)
+        for now in (1, 2, 3, 4, 5, 6, 7):
+            throttle.hit("a", now = now)
+        return throttle
+
+    for start in (7, 8, 9.5, 12):
+        wait = busy().retry_after("a", now = start)
+        assert wait > 0
+        assert busy().retry_after("a", now = start + wait) == 0
+        assert busy().retry_after("a", now = start + wait - 1) > 0
+
+
+def test_retry_after_while_the_previous_window_decays():
+    throttle = limiter(limit = 4, window = 10)
+    for _ in range(4):
+        throttle.hit("a", now = 5)
+    throttle.hit("a", now = 12)
+    # 4 * (1 - elapsed / 10) + 1 < 4 once elapsed > 2.5
+    assert throttle.retry_after("a", now = 12) == 1
+    assert throttle.retry_after("a", now = 13) == 0
+
+
+def test_counts_older_than_the_previous_window_are_forgotten():
+    throttle = limiter()
+    for _ in range(3):
+        throttle.hit("a", now = 0)
+    assert throttle.retry_after("a", now = 120) == 0
+
+
+def test_least_recently_seen_key_is_dropped():
+    throttle = limiter(limit = 1, max_keys = 2)
+    throttle.hit("a", now = 0)
+    throttle.hit("b", now = 0)
+    throttle.hit("c", now = 0)
+    assert len(throttle) == 2
+    assert throttle.retry_after("a", now = 0) == 0
+    assert throttle.retry_after("c", now = 0) > 0
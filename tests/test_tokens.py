@@ -0,0 +1,92 @@
+import pytest
+from ecdsa import NIST256p, SigningKey
+from jose import JWTError, jwt
+from core import tokens
+from core.tokens import KeyRing, TokenKey, load_access_key_ring
+
+
+def hmac_key(kid, secret = None):
+    return TokenKey(kid, "HS256", secret or f"secret-{kid}")
+
+
+def test_sign_writes_the_active_kid_and_verifies():
+    ring = KeyRing([hmac_key("k1"), hmac_key("k2")], active_kid = "k2")
+    token = ring.sign({ "id": 1 })
+    assert jwt.get_unverified_header(token)["kid"] == "k2"
+    assert ring.verify(token) == { "id": 1 }
+
+
+def test_tokens_of_the_old_key_verify_after_rotation():
+    old_ring = KeyRing([hmac_key("k1")], active_kid = "k1")
+    old_token = old_ring.sign({ "id": 1 })
+
+    rotated = KeyRing([hmac_key("k1"), hmac_key("k2")], active_kid = "k2")
+    new_token = rotated.sign({ "id": 2 })
+    assert rotated.verify(old_token) == { "id": 1 }
+    assert rotated.verify(new_token) == { "id": 2 }
+
+    # Once the old key is removed, its tokens are rejected
+    retired = KeyRing([hmac_key("k2")], active_kid = "k2")
+    assert retired.verify(new_token) == { "id": 2 }
+    with pytest.raises(JWTError):
+        retired.verify(old_token)
+
+
+def test_verify_selects_the_key_by_kid():
+    signer = KeyRing([hmac_key("k1", "first")], active_kid = "k1")
+    token = signer.sign({ "id": 1 })
+    # Same kid, different secret: the key named by the header is used and the signature fails
+    with pytest.raises(JWTError):
+        KeyRing([hmac_key("k1", "other"), hmac_key("k2", "first")]).verify(token)
+
+
+def test_unknown_kid_is_rejected():
+    token = KeyRing([hmac_key("k9")], active_kid = "k9").sign({ "id": 1 })
+    with pytest.raises(JWTError, match = "Unknown signing key"):
+        KeyRing([hmac_key("k1")], active_kid = "k1").verify(token)
+
+
+def test_algorithm_is_pinned_to_the_key():
+    token = jwt.encode({ "id": 1 }, "secret-k1", algorithm = "HS512", headers = { "kid": "k1" })
+    with pytest.raises(JWTError):
+        KeyRing([hmac_key("k1")]).verify(token)
+
+
+def test_active_kid_must_be_a_signing_key():
+    with pytest.raises(ValueError):
+        KeyRing([hmac_key("k1")], active_kid = "missing")
+    with pytest.raises(ValueError):
+        KeyRing([hmac_key("k1")]).sign({ "id": 1 })
+
+
+def test_jwks_publishes_only_public_keys_and_verifies():
+    pem = SigningKey.generate(curve = NIST256p).to_pem().decode()
+    ring = KeyRing([TokenKey("ec1", "ES256", pem), hmac_key("k1")], active_kid = "ec1")
+    document = ring.jwks()
+    assert [key["kid"] for key in document["keys"]] == ["ec1"]
+    assert "d" not in document["keys"][0]
+
+    token = ring.sign({ "id": 1 })
+    verifier = KeyRing.from_jwks(document)
+    assert verifier.verify(token) == { "id": 1 }
+    with pytest.raises(ValueError):
+        verifier.sign({ "id": 1 })
+
+
+def test_kidless_tokens_fall_back_to_secret_key(monkeypatch):
+    monkeypatch.setattr(tokens.settings, "SECRET_KEY", "legacy-secret")
+    monkeypatch.setattr(tokens.settings, "TOKEN_CREATION_ALGORITHM", "HS256")
+    monkeypatch.setattr(tokens.settings, "TOKEN_KEYS", { "k1": "secret-k1" })
+    monkeypatch.setattr(tokens.settings, "TOKEN_ACTIVE_KID", None)
+
+    # Without an active kid, new tokens are signed with SECRET_KEY and carry no kid
+    ring = load_access_key_ring()
+    token = ring.sign({ "id": 1 })
+    assert "kid" not in jwt.get_unverified_header(token)
+    assert jwt.decode(token, "legacy-secret", algorithms = ["HS256"]) == { "id": 1 }
+
+    # After switching to a kid, tokens issued before the switch still verify
+    monkeypatch.setattr(tokens.settings, "TOKEN_ACTIVE_KID", "k1")
+    rotated = load_access_key_ring()
+    assert rotated.verify(token) == { "id": 1 }
+    assert jwt.get_unverified_header(rotated.sign({ "id": 2 }))["kid"] == "k1"
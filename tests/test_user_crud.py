@@ -0,0 +1,41 @@
+import asyncio
+import orjson
+import pytest
+from core.database import session
+from core.security import user_cache
+from crud.user_crud import CRUD, profile_etag
+
+
+@pytest.fixture
+def db(engine):
+    db = session()
+    yield db
+    db.close()
+
+
+def get_profile(user_id, db, if_none_match = None):
+    return asyncio.run(CRUD().get_profile(user_id, db, if_none_match))
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_get_profile_returns_304_for_a_current_etag(db, user_id, cached):
+    user_cache.clear()
+    response = get_profile(user_id, db)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert etag == profile_etag(user_id, 1)
+    assert orjson.loads(response.body)["email"].startswith("test-")
+    if not cached:
+        user_cache.clear()
+
+    not_modified = get_profile(user_id, db, etag)
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.body == b""
+
+
+def test_get_profile_returns_the_profile_for_a_stale_etag(db, user_id):
+    user_cache.clear()
+    response = get_profile(user_id, db, profile_etag(user_id, 0))
+    assert response.status_code == 200
+    assert response.headers["etag"] == profile_etag(user_id, 1)
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import text
+from core.utils import etag_matches, like_pattern
+
+
+def test_etag_matches_strong_and_weak_tags():
+    assert etag_matches('W/"1-2"', 'W/"1-2"')
+    assert etag_matches('"1-2"', 'W/"1-2"')
+    assert etag_matches('W/"1-2"', '"1-2"')
+    assert not etag_matches('W/"1-3"', 'W/"1-2"')
+
+
+def test_etag_matches_any_tag_in_a_list():
+    assert etag_matches('"a", W/"1-2" , "b"', 'W/"1-2"')
+    assert not etag_matches('"a", "b"', 'W/"1-2"')
+
+
+def test_etag_matches_wildcard():
+    assert etag_matches("*", 'W/"1-2"')
+    assert etag_matches('"a", *', 'W/"1-2"')
+
+
+def test_etag_matches_without_header():
+    assert not etag_matches(None, 'W/"1-2"')
+    assert not etag_matches("", 'W/"1-2"')
+
+
+def test_like_pattern_escapes_wildcards_and_the_escape_character():
+    assert like_pattern("50%") == "%50\\%%"
+    assert like_pattern("a_b") == "%a\\_b%"
+    assert like_pattern("C:\\dir") == "%C:\\\\dir%"
+    assert like_pattern("\\%") == "%\\\\\\%%"
+
+
+def test_like_pattern_prefix():
+    assert like_pattern("ab") == "%ab%"
+    assert like_pattern("ab", prefix = True) == "ab%"
+    assert like_pattern("a_", prefix = True) == "a\\_%"
+
+
+@pytest.mark.parametrize("value, term, matches", [
+    ("100% cotton", "100%", True),
+    ("1000 cotton", "100%", False),
+    ("snake_case", "e_c", True),
+    ("snakeXcase", "e_c", False),
+    ("C:\\dir", "C:\\d", True),
+    ("C:d", "C:\\d", False),
+])
+def test_like_pattern_matches_literally(engine, value, term, matches):
+    with engine.connect() as connection:
+        result = connection.execute(
+            text("SELECT :value ILIKE :pattern ESCAPE '\\'"), { "value": value, "pattern": like_pattern(term) }
+        ).scalar()
+    assert result is matches
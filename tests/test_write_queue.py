@@ -0,0 +1,127 @@
+import asyncio
+import pytest
+from core.write_queue import WriteQueue
+
+
+class FakeSession:
+    def __init__(self):
+        self.executed = []
+        self.commits = 0
+
+    def execute(self, statement):
+        self.executed.append(statement)
+
+    def commit(self):
+        self.commits += 1
+
+
+def make_queue(durability, flush_ms = 10000):
+    """
+    A queue whose builders return (kind, rows) tuples and whose flushes are recorded instead of written.
+    """
+    queue = WriteQueue(durability = durability, flush_ms = flush_ms)
+    queue.register("token", lambda rows: ("token", rows))
+    queue.register("pair", lambda rows: [("lock", rows), ("pair", rows)])
+    queue.flushed = []
+    queue._write = queue.flushed.append
+    return queue
+
+
+def test_unknown_durability_is_rejected():
+    with pytest.raises(ValueError):
+        WriteQueue(durability = "eventually")
+
+
+def test_inline_writes_run_in_the_request_session():
+    async def scenario():
+        queue = make_queue("inline")
+        queue.start()
+        db = FakeSession()
+        await queue.submit([("token", 1, { "v": 1 }), ("pair", 1, { "v": 2 })], db)
+        return queue, db
+
+    queue, db = asyncio.run(scenario())
+    assert db.executed == [("token", [{ "v": 1 }]), ("lock", [{ "v": 2 }]), ("pair", [{ "v": 2 }])]
+    assert db.commits == 1
+    assert queue.flushed == []
+
+
+def test_flush_merges_writes_keeping_the_last_per_key():
+    async def scenario():
+        queue = make_queue("async")
+        queue.start()
+        await queue.submit([("token", 1, { "v": "first" })], None)
+        await queue.submit([("token", 2, { "v": "other" })], None)
+        await queue.submit([("token", 1, { "v": "last" })], None)
+        await queue.submit([("pair", 1, { "v": "pair" })], None)
+        await queue.close()
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert len(queue.flushed) == 1
+    token, lock, pair = queue.flushed[0]
+    assert token[0] == "token"
+    assert sorted(row["v"] for row in token[1]) == ["last", "other"]
+    assert lock == ("lock", [{ "v": "pair" }])
+    assert pair == ("pair", [{ "v": "pair" }])
+
+
+def test_discard_drops_a_pending_write():
+    async def scenario():
+        queue = make_queue("async")
+        queue.start()
+        await queue.submit([("token", 1, { "v": 1 }), ("token", 2, { "v": 2 })], None)
+        assert queue.pending("token", 1) == { "v": 1 }
+        await queue.discard("token", 1)
+        assert queue.pending("token", 1) is None
+        await queue.close()
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert queue.flushed == [[("token", [{ "v": 2 }])]]
+    assert queue.pending("token", 2) is None
+
+
+def test_async_returns_before_the_flush():
+    async def scenario():
+        queue = make_queue("async")
+        queue.start()
+        await queue.submit([("token", 1, { "v": 1 })], None)
+        before_close = list(queue.flushed)
+        await queue.close()
+        return before_close, queue
+
+    before_close, queue = asyncio.run(scenario())
+    assert before_close == []
+    assert queue.flushed == [[("token", [{ "v": 1 }])]]
+
+
+def test_sync_waits_for_the_flush():
+    async def scenario():
+        queue = make_queue("sync", flush_ms = 5)
+        queue.start()
+        await queue.submit([("token", 1, { "v": 1 })], None)
+        after_submit = list(queue.flushed)
+        await queue.close()
+        return after_submit
+
+    assert asyncio.run(scenario()) == [[("token", [{ "v": 1 }])]]
+
+
+def test_sync_raises_when_the_flush_fails():
+    def fail(statements):
+        raise RuntimeError("database down")
+
+    async def scenario():
+        queue = make_queue("sync", flush_ms = 5)
+        queue._write = fail
+        queue.start()
+        try:
+            with pytest.raises(RuntimeError, match = "database down"):
+                await queue.submit([("token", 1, { "v": 1 })], None)
+            # The failed write is no longer pending
+            assert queue.pending("token", 1) is None
+        finally:
+            await queue.close()
+
+    asyncio.run(scenario())